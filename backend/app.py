@@ -18,6 +18,9 @@ def create_app():
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
         CACHE_TYPE='SimpleCache',
+        # Offload media bodies to the front-end server in production
+        USE_X_SENDFILE=os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes'),
+        MEDIA_X_ACCEL_PREFIX=os.environ.get('MEDIA_X_ACCEL_PREFIX'),
     )
 
     basedir = os.path.abspath(os.path.dirname(__file__))
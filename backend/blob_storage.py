@@ -0,0 +1,335 @@
+"""
+Blob storage for uploaded files.
+
+Backends share one small interface: streaming `put`/`open`, `stat`, `exists`,
+`delete` and `compose`, which joins stored blobs into one (server-side on S3). Uploads are content-addressed: `put` without a key hashes the
+stream while writing it and stores it under its SHA-256, so identical files
+are kept once and a key never changes meaning (safe to cache forever).
+Mutable documents such as saved workout sessions pass an explicit key.
+
+- LocalBlobStorage keeps blobs under a directory (default backend/blobs,
+  deliberately outside the legacy uploads/ tree), sharded by hash prefix.
+- S3BlobStorage talks to S3 or any S3-compatible service (MinIO, a local
+  moto server) via `endpoint_url`; it needs boto3.
+
+The backend is chosen from the environment so web workers and background
+worker processes resolve the same store:
+
+    BLOB_STORAGE=local|s3      (default local)
+    BLOB_STORAGE_ROOT          local directory
+    S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION
+"""
+import hashlib
+import io
+import mimetypes
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    HAS_BOTO3 = True
+except ImportError:
+    HAS_BOTO3 = False
+
+    class ClientError(Exception):
+        """Stand-in so S3 error handling still works with an injected client."""
+
+CHUNK_SIZE = 1024 * 1024
+# Uploads larger than this spill from memory to a temp file while being hashed for S3
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+DEFAULT_URL_EXPIRY = 3600
+# S3 multipart uploads require every part but the last to be at least this large
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+# Not under UPLOADS_ROOT: /uploads serves that tree, and explicitly keyed blobs (sessions, upload parts) are private
+DEFAULT_LOCAL_ROOT = pathlib.Path(__file__).resolve().parent / 'blobs'
+
+_CONTENT_KEY = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+
+
+class BlobNotFound(KeyError):
+    pass
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    key: str
+    size: int
+    sha256: str = None
+    content_type: str = None
+
+    def to_dict(self):
+        return {'key': self.key, 'size': self.size, 'sha256': self.sha256, 'content_type': self.content_type}
+
+
+def content_key(digest, filename=None):
+    """Storage key for content with the given SHA-256; the extension is kept so the type survives."""
+    ext = pathlib.PurePosixPath(filename or '').suffix.lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', ext):
+        ext = ''
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def is_content_key(key):
+    return bool(_CONTENT_KEY.match(key or ''))
+
+
+def guess_content_type(key):
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+def _copy_hashing(stream, out, chunk_size=CHUNK_SIZE):
+    """Copies a stream into `out`, returning (size, sha256 hex)."""
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        sha.update(chunk)
+        out.write(chunk)
+        size += len(chunk)
+    return size, sha.hexdigest()
+
+
+class ConcatReader:
+    """File-like reader over several stored blobs in order, opening one at a time."""
+
+    def __init__(self, storage, keys):
+        self._storage = storage
+        self._keys = list(keys)
+        self._current = None
+
+    def read(self, size=-1):
+        while True:
+            if self._current is None:
+                if not self._keys:
+                    return b''
+                self._current = self._storage.open(self._keys.pop(0))
+            data = self._current.read(size if size and size > 0 else CHUNK_SIZE)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+class BlobStorage:
+    """Interface implemented by every backend."""
+
+    def put(self, stream, filename=None, key=None, content_type=None):
+        """Stores a binary stream and returns its BlobInfo. Without `key` the blob is content-addressed."""
+        raise NotImplementedError
+
+    def put_bytes(self, data, filename=None, key=None, content_type=None):
+        return self.put(io.BytesIO(data), filename=filename, key=key, content_type=content_type)
+
+    def open(self, key):
+        """A readable binary file object for the blob. Raises BlobNotFound."""
+        raise NotImplementedError
+
+    def stat(self, key):
+        """BlobInfo for a stored blob. Raises BlobNotFound."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        try:
+            self.stat(key)
+        except BlobNotFound:
+            return False
+        return True
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def compose(self, keys, key, content_type=None, sha256=None):
+        """Stores the concatenation of the blobs at `keys` under `key` and returns its BlobInfo."""
+        reader = ConcatReader(self, keys)
+        try:
+            return self.put(reader, key=key, content_type=content_type)
+        finally:
+            reader.close()
+
+    def local_path(self, key):
+        """Filesystem path of the blob when the backend is local, else None."""
+        return None
+
+    def url(self, key, expires=DEFAULT_URL_EXPIRY):
+        """A direct download URL when the backend can provide one, else None (serve through the app)."""
+        return None
+
+
+class LocalBlobStorage(BlobStorage):
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise BlobNotFound(key)
+        return path
+
+    def put(self, stream, filename=None, key=None, content_type=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f".upload-{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as out:
+                size, digest = _copy_hashing(stream, out)
+            addressed = key is None
+            key = key or content_key(digest, filename)
+            target = self._path(key)
+            # Identical content is already stored under its hash; the temp copy is discarded
+            if not (addressed and target.is_file()):
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return BlobInfo(key, size, digest, content_type or guess_content_type(key))
+
+    def open(self, key):
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def stat(self, key):
+        path = self._path(key)
+        if not path.is_file():
+            raise BlobNotFound(key)
+        return BlobInfo(key, path.stat().st_size, content_type=guess_content_type(key))
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except (FileNotFoundError, BlobNotFound):
+            pass
+
+    def local_path(self, key):
+        return str(self._path(key))
+
+
+class S3BlobStorage(BlobStorage):
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, client=None):
+        if client is None:
+            if not HAS_BOTO3:
+                raise RuntimeError("S3 blob storage requires boto3")
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def _object_key(self, key):
+        return self.prefix + key
+
+    def put(self, stream, filename=None, key=None, content_type=None):
+        # The key of a content-addressed blob is only known after hashing, so spool first
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            size, digest = _copy_hashing(stream, spool)
+            addressed = key is None
+            key = key or content_key(digest, filename)
+            content_type = content_type or guess_content_type(key)
+            if addressed and self.exists(key):
+                return BlobInfo(key, size, digest, content_type)
+            spool.seek(0)
+            self.client.upload_fileobj(spool, self.bucket, self._object_key(key), ExtraArgs={
+                'ContentType': content_type,
+                'Metadata': {'sha256': digest},
+            })
+        return BlobInfo(key, size, digest, content_type)
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                raise BlobNotFound(key)
+            raise
+
+    def stat(self, key):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'NotFound'):
+                raise BlobNotFound(key)
+            raise
+        return BlobInfo(key, head['ContentLength'], head.get('Metadata', {}).get('sha256'), head.get('ContentType'))
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def compose(self, keys, key, content_type=None, sha256=None):
+        # Copied server-side with a multipart upload; parts too small for one are streamed instead
+        sizes = [self.stat(k).size for k in keys]
+        if not keys or len(keys) > S3_MAX_PARTS or any(size < S3_MIN_PART_SIZE for size in sizes[:-1]):
+            return super().compose(keys, key, content_type, sha256)
+        content_type = content_type or guess_content_type(key)
+        target = self._object_key(key)
+        extra = {'Metadata': {'sha256': sha256}} if sha256 else {}
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=target, ContentType=content_type, **extra)['UploadId']
+        try:
+            parts = []
+            for number, part_key in enumerate(keys, start=1):
+                copied = self.client.upload_part_copy(
+                    Bucket=self.bucket, Key=target, UploadId=upload_id, PartNumber=number,
+                    CopySource={'Bucket': self.bucket, 'Key': self._object_key(part_key)})
+                parts.append({'PartNumber': number, 'ETag': copied['CopyPartResult']['ETag']})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=target, UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=target, UploadId=upload_id)
+            raise
+        return BlobInfo(key, sum(sizes), sha256, content_type)
+
+    def url(self, key, expires=DEFAULT_URL_EXPIRY):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)}, ExpiresIn=expires)
+
+
+def storage_from_env(environ=os.environ):
+    backend = (environ.get('BLOB_STORAGE') or 'local').lower()
+    if backend == 's3':
+        return S3BlobStorage(
+            environ['S3_BUCKET'],
+            prefix=environ.get('S3_PREFIX', ''),
+            endpoint_url=environ.get('S3_ENDPOINT_URL') or None,
+            region=environ.get('S3_REGION') or None,
+        )
+    if backend == 'local':
+        return LocalBlobStorage(environ.get('BLOB_STORAGE_ROOT') or DEFAULT_LOCAL_ROOT)
+    raise ValueError(f"Unknown BLOB_STORAGE backend: {backend}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_blob_storage():
+    """The process-wide storage backend, created from the environment on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = storage_from_env()
+        return _storage
+
+
+def set_blob_storage(storage):
+    """Replaces the process-wide backend (e.g. with a bucket-backed one configured in code)."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
+
+
+def blob_url(key):
+    """App URL a stored blob is downloaded from."""
+    return f'/blobs/{key}'
+
@@ -0,0 +1,224 @@
+"""
+Imports body-stat history from smart-scale and tracker exports (CSV or JSON lines).
+
+Rows stream in and are written in batches. Each batch looks up the client's
+existing entries for its dates in one query, so a re-import or an overlapping
+export updates those days instead of duplicating them. Recorded measurement
+fields are merged into the stored ones; a field the file leaves blank keeps
+its stored value. Several readings of the same day within a file are merged
+in file order, later readings winning. The caller commits.
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import update
+
+from .models import db, BodyStat
+from .body_stats import MEASUREMENT_FIELDS
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S',
+                '%m/%d/%Y', '%m/%d/%Y %H:%M', '%d.%m.%Y', '%d.%m.%Y %H:%M', '%Y/%m/%d')
+POUNDS_TO_KG = 0.45359237
+
+# Header names recognised when no explicit mapping is given for a field
+COLUMN_ALIASES = {
+    'date': ('date', 'time', 'timestamp', 'datetime', 'measurement date', 'recorded_at'),
+    'weight': ('weight', 'weight (kg)', 'weight_kg', 'weight (lb)', 'weight_lb', 'body weight'),
+    'body_fat': ('body_fat', 'body fat', 'body fat (%)', 'body fat %', 'fat %', 'bodyfat', 'fat_ratio'),
+    'muscle_mass': ('muscle_mass', 'muscle mass', 'muscle mass (kg)', 'skeletal muscle', 'muscle'),
+    'chest': ('chest',),
+    'waist': ('waist',),
+    'hips': ('hips', 'hip'),
+    'arms': ('arms', 'arm', 'biceps'),
+    'thighs': ('thighs', 'thigh'),
+    'neck': ('neck',),
+}
+
+
+def resolve_column_mapping(header, mapping=None):
+    """
+    {field: source column} for the file's header. Explicit `mapping` entries
+    win; other fields are matched case-insensitively against COLUMN_ALIASES.
+    """
+    mapping = dict(mapping or {})
+    by_lower = {str(h).strip().lower(): h for h in header if h}
+    resolved = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if mapping.get(field):
+            resolved[field] = mapping[field]
+            continue
+        for alias in aliases:
+            if alias in by_lower:
+                resolved[field] = by_lower[alias]
+                break
+    return resolved
+
+
+def _parse_date(value, date_format=None):
+    value = str(value or '').strip()
+    for fmt in ((date_format,) if date_format else DATE_FORMATS):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date: {value!r}")
+
+
+def _parse_reading(value, field):
+    if value is None:
+        return None
+    value = str(value).strip().replace(',', '.').rstrip('%').strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"invalid {field}: {value!r}")
+    if number <= 0:
+        raise ValueError(f"{field} must be positive")
+    return number
+
+
+def parse_body_stat_row(row, columns, date_format=None, weight_unit=None):
+    """Validates one row into {'date', 'weight', 'measurements'}. Raises ValueError."""
+    def value(field):
+        column = columns.get(field)
+        return row.get(column) if column else None
+
+    weight = _parse_reading(value('weight'), 'weight')
+    if weight_unit is None:
+        weight_unit = 'lb' if 'lb' in str(columns.get('weight', '')).lower() else 'kg'
+    if weight is not None and weight_unit == 'lb':
+        weight = round(weight * POUNDS_TO_KG, 2)
+    measurements = {}
+    for field in MEASUREMENT_FIELDS:
+        reading = _parse_reading(value(field), field)
+        if reading is not None:
+            measurements[field] = reading
+    if weight is None and not measurements:
+        raise ValueError("no readings")
+    return {'date': _parse_date(value('date'), date_format), 'weight': weight, 'measurements': measurements}
+
+
+def _iter_rows(stream, fmt):
+    """Yields (line number, header-keyed row or exception)."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        # Data starts on line 2, after the header
+        for line_number, row in enumerate(reader, start=2):
+            yield line_number, row
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError("expected a JSON object")
+
+
+def _decode(raw):
+    try:
+        measurements = json.loads(raw or '{}')
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return measurements if isinstance(measurements, dict) else {}
+
+
+def _write_batch(client_id, readings):
+    """Upserts one batch of {date: reading}. Returns (inserted, updated)."""
+    existing = {}
+    rows = db.session.query(BodyStat.id, BodyStat.date, BodyStat.weight, BodyStat.measurements) \
+        .filter(BodyStat.client_id == client_id, BodyStat.date.in_(list(readings))) \
+        .order_by(BodyStat.date, BodyStat.id) \
+        .all()
+    for row in rows:
+        # Legacy duplicates for a day: the first row absorbs the import
+        existing.setdefault(row.date, row)
+
+    inserts, updates = [], []
+    for day, reading in readings.items():
+        row = existing.get(day)
+        if row is None:
+            inserts.append({
+                'id': str(uuid.uuid4()),
+                'client_id': client_id,
+                'date': day,
+                'weight': reading['weight'],
+                'measurements': json.dumps(reading['measurements']),
+            })
+            continue
+        measurements = {k: v for k, v in _decode(row.measurements).items() if v is not None}
+        measurements.update(reading['measurements'])
+        updates.append({
+            'id': row.id,
+            'weight': reading['weight'] if reading['weight'] is not None else row.weight,
+            'measurements': json.dumps(measurements),
+        })
+    if inserts:
+        db.session.execute(db.insert(BodyStat), inserts)
+    if updates:
+        db.session.execute(update(BodyStat), updates)
+    return len(inserts), len(updates)
+
+
+def import_body_stats(client_id, stream, fmt='csv', mapping=None, date_format=None, weight_unit=None,
+                      batch_size=IMPORT_BATCH_SIZE):
+    """
+    Imports readings for one client from a binary file object in 'csv' or
+    'jsonl' format. `weight_unit` is 'kg' or 'lb'; by default it is 'lb' when
+    the weight column's name mentions it. Returns counts plus the
+    first MAX_REPORTED_ERRORS row errors. Raises LookupError when a CSV has
+    no date column. Caller commits.
+    """
+    summary = {'rows': 0, 'inserted': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    batch = {}
+    # CSV rows share one header; JSON objects may differ in their keys
+    column_mappings = {}
+
+    def flush():
+        inserted, updated = _write_batch(client_id, batch)
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        batch.clear()
+
+    for line_number, row in _iter_rows(stream, fmt):
+        summary['rows'] += 1
+        try:
+            if isinstance(row, Exception):
+                raise ValueError(str(row))
+            keys = tuple(row.keys())
+            columns = column_mappings.get(keys)
+            if columns is None:
+                columns = column_mappings[keys] = resolve_column_mapping(keys, mapping)
+            if 'date' not in columns:
+                if fmt == 'csv':
+                    raise LookupError("No column found for: date")
+                raise ValueError("missing date")
+            parsed = parse_body_stat_row(row, columns, date_format, weight_unit)
+        except ValueError as e:
+            summary['error_count'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+
+        reading = batch.get(parsed['date'])
+        if reading is None:
+            batch[parsed['date']] = parsed
+        else:
+            if parsed['weight'] is not None:
+                reading['weight'] = parsed['weight']
+            reading['measurements'].update(parsed['measurements'])
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return summary
@@ -0,0 +1,145 @@
+"""
+Body-stat time series for progress charts.
+
+A series is read with one query and laid out on a daily grid spanning the
+requested range. Trailing rolling averages (7, 14 and 30 calendar days by
+default) come from cumulative sums over that grid, so each window is one
+vectorized subtraction and gaps between weigh-ins simply shrink the sample.
+Several readings on the same day are averaged first.
+
+Long histories are reduced with Largest-Triangle-Three-Buckets (LTTB), which
+keeps the points that shape the line (peaks, dips, plateaus) rather than
+every n-th reading. Rolling averages are computed on the full series before
+downsampling and returned at the kept points; readings from before the range
+feed the windows of its first days.
+"""
+import json
+from datetime import timedelta
+
+import numpy as np
+
+from .models import db, BodyStat
+
+MEASUREMENT_FIELDS = ('chest', 'waist', 'hips', 'arms', 'thighs', 'neck', 'body_fat', 'muscle_mass')
+SERIES_FIELDS = ('weight',) + MEASUREMENT_FIELDS
+ROLLING_WINDOWS = (7, 14, 30)
+DEFAULT_SERIES_POINTS = 200
+MAX_SERIES_POINTS = 2000
+
+
+def _to_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number if np.isfinite(number) else np.nan
+
+
+def _decode_measurements(raw):
+    try:
+        measurements = json.loads(raw or '{}')
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return measurements if isinstance(measurements, dict) else {}
+
+
+def load_series(client_id, start, end, fields=('weight',)):
+    """
+    Daily values for `fields` between start and end (inclusive).
+    Returns (days, {field: values}); values are NaN where nothing was recorded.
+    """
+    columns = [BodyStat.date, BodyStat.weight]
+    needs_measurements = any(field != 'weight' for field in fields)
+    if needs_measurements:
+        columns.append(BodyStat.measurements)
+    rows = db.session.query(*columns) \
+        .filter(BodyStat.client_id == client_id,
+                BodyStat.date >= start,
+                BodyStat.date <= end) \
+        .all()
+
+    day_count = (end - start).days + 1
+    offsets = np.fromiter(((row[0] - start).days for row in rows), dtype=np.int64, count=len(rows))
+    decoded = [_decode_measurements(row[2]) for row in rows] if needs_measurements else []
+
+    series = {}
+    for field in fields:
+        if field == 'weight':
+            raw = np.fromiter((_to_number(row[1]) for row in rows), dtype=float, count=len(rows))
+        else:
+            raw = np.fromiter((_to_number(m.get(field)) for m in decoded), dtype=float, count=len(rows))
+        recorded = ~np.isnan(raw)
+        sums = np.zeros(day_count)
+        counts = np.zeros(day_count)
+        np.add.at(sums, offsets[recorded], raw[recorded])
+        np.add.at(counts, offsets[recorded], 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            series[field] = np.where(counts > 0, sums / counts, np.nan)
+    return np.arange(day_count), series
+
+
+def rolling_means(values, windows=ROLLING_WINDOWS):
+    """Trailing means over calendar-day windows of a daily series, ignoring missing days."""
+    recorded = ~np.isnan(values)
+    value_sums = np.concatenate(([0.0], np.cumsum(np.where(recorded, values, 0.0))))
+    value_counts = np.concatenate(([0], np.cumsum(recorded)))
+    ends = np.arange(1, len(values) + 1)
+    means = {}
+    for window in windows:
+        starts = np.maximum(ends - window, 0)
+        counts = value_counts[ends] - value_counts[starts]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[window] = np.where(counts > 0, (value_sums[ends] - value_sums[starts]) / counts, np.nan)
+    return means
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling to `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # First and last points are always kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            next_x, next_y = x[hi:edges[b + 2]].mean(), y[hi:edges[b + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Triangle area (times two) formed with the previous kept point and the next bucket's mean
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                       - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        kept[b + 1] = previous
+    return kept
+
+
+def body_stat_series(client_id, start, end, fields=('weight',), points=DEFAULT_SERIES_POINTS,
+                     windows=ROLLING_WINDOWS):
+    """
+    Chart-ready series per field: recorded dates, values and rolling averages,
+    downsampled to at most `points` entries.
+    """
+    # Load enough history before `start` that the first days' windows are full
+    lookback = max(windows, default=1) - 1
+    days, daily = load_series(client_id, start - timedelta(days=lookback), end, fields)
+    days = days[lookback:] - lookback
+    result = {}
+    for field, values in daily.items():
+        means = {w: m[lookback:] for w, m in rolling_means(values, windows).items()}
+        values = values[lookback:]
+        recorded = np.flatnonzero(~np.isnan(values))
+        kept = recorded[lttb_indices(days[recorded], values[recorded], points)]
+        result[field] = {
+            'count': int(recorded.size),
+            'dates': [(start + timedelta(days=int(d))).isoformat() for d in kept],
+            'values': np.round(values[kept], 2).tolist(),
+            'rolling': {str(w): np.round(means[w][kept], 2).tolist() for w in windows},
+        }
+    return result
@@ -0,0 +1,188 @@
+"""
+Expands program schedules into compact calendar indexes.
+
+A template assignment is laid out as a weekly microcycle starting on its
+start_date: template day i falls on offset i of a cycle 7 * ceil(days / 7)
+long, so a 6-day split trains six days and rests the seventh. Days that are
+disabled for the client or flagged `rest_day` stay in place as rest days,
+keeping weekday alignment. A periodized Program is laid out week by week and
+ends after its last week instead of repeating.
+
+The index stores one small integer per cycle day (-1 for rest), so "session
+for date X" is a single array lookup and range queries are one vectorized pass.
+"""
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+
+from .template_cache import iter_day_exercises
+from .template_versions import get_assignment_days
+
+REST = -1
+MAX_CACHED_CALENDARS = 512
+
+# Month-view status codes, one character per day
+STATUS_COMPLETED = 'C'
+STATUS_MISSED = 'M'
+STATUS_SCHEDULED = 'S'
+STATUS_REST = '-'
+STATUS_CODES = {
+    STATUS_COMPLETED: 'completed',
+    STATUS_MISSED: 'missed',
+    STATUS_SCHEDULED: 'scheduled',
+    STATUS_REST: 'rest',
+}
+
+
+class CalendarIndex:
+    def __init__(self, start_date, slots, sessions, repeat=True):
+        self.start_date = start_date
+        self.slots = np.asarray(slots, dtype=np.int16)
+        self.sessions = sessions
+        self.repeat = repeat
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _slot_ids(self, offsets):
+        ids = np.full(offsets.shape, REST, dtype=np.int16)
+        if not len(self.slots):
+            return ids
+        valid = offsets >= 0
+        if self.repeat:
+            ids[valid] = self.slots[offsets[valid] % len(self.slots)]
+        else:
+            valid &= offsets < len(self.slots)
+            ids[valid] = self.slots[offsets[valid]]
+        return ids
+
+    def session_for(self, day):
+        """Returns the session scheduled on `day`, or None for rest days and dates outside the program."""
+        session_id = self._slot_ids(np.array([(day - self.start_date).days]))[0]
+        return None if session_id == REST else self.sessions[session_id]
+
+    def sessions_in_range(self, start, end):
+        """Returns [(date, session)] for every scheduled session from `start` to `end` inclusive."""
+        if end < start:
+            return []
+        first = (start - self.start_date).days
+        offsets = np.arange(first, first + (end - start).days + 1)
+        ids = self._slot_ids(offsets)
+        scheduled = np.flatnonzero(ids != REST)
+        return [(start + timedelta(days=int(i)), self.sessions[ids[i]]) for i in scheduled]
+
+
+def day_statuses(calendar, start, end, logged_dates, today):
+    """
+    Returns one status code per day from `start` to `end`: completed when a
+    workout was logged that day (scheduled or not), missed for past scheduled
+    days without a log, scheduled for today onwards, otherwise rest.
+    `calendar` may be None when the client has no active assignment.
+    """
+    scheduled = {d for d, _ in calendar.sessions_in_range(start, end)} if calendar else set()
+    codes = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        if day in logged_dates:
+            codes.append(STATUS_COMPLETED)
+        elif day in scheduled:
+            codes.append(STATUS_MISSED if day < today else STATUS_SCHEDULED)
+        else:
+            codes.append(STATUS_REST)
+    return ''.join(codes)
+
+
+def _session(day, **extra):
+    name = day.get('name') if isinstance(day, dict) else None
+    return {
+        **extra,
+        'name': name,
+        'exercise_count': sum(1 for _ in iter_day_exercises(day)),
+    }
+
+
+def _is_rest(day):
+    return not isinstance(day, dict) or bool(day.get('rest_day'))
+
+
+def build_assignment_calendar(assignment, template, days=None):
+    """Lays out an assignment's days; `days` may be passed when already loaded."""
+    if days is None:
+        days = get_assignment_days(assignment, template)
+    try:
+        enabled_days = json.loads(assignment.enabled_days) if assignment.enabled_days else []
+    except json.JSONDecodeError:
+        enabled_days = []
+    enabled = set(enabled_days or range(len(days)))
+
+    cycle_length = 7 * max(1, math.ceil(len(days) / 7))
+    slots = [REST] * cycle_length
+    sessions = []
+    for i, day in enumerate(days):
+        if i in enabled and not _is_rest(day):
+            slots[i] = len(sessions)
+            sessions.append(_session(day, day_index=i))
+    return CalendarIndex(assignment.start_date, slots, sessions, repeat=True)
+
+
+def build_program_calendar(program, start_date):
+    """Lays out Program.weeks; each week is a list of up to 7 days (or {'days': [...]})."""
+    try:
+        weeks = json.loads(program.weeks) if program.weeks else []
+    except json.JSONDecodeError:
+        weeks = []
+
+    slots = []
+    sessions = []
+    for week_index, week in enumerate(weeks if isinstance(weeks, list) else []):
+        week_days = week.get('days', []) if isinstance(week, dict) else week
+        week_days = list(week_days)[:7] if isinstance(week_days, list) else []
+        week_days += [None] * (7 - len(week_days))
+        for weekday, day in enumerate(week_days):
+            if _is_rest(day):
+                slots.append(REST)
+            else:
+                slots.append(len(sessions))
+                sessions.append(_session(day, week=week_index, weekday=weekday))
+    return CalendarIndex(start_date, slots, sessions, repeat=False)
+
+
+class _CalendarCache:
+    def __init__(self, max_entries=MAX_CACHED_CALENDARS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            calendar = self._entries.get(key)
+            if calendar is not None:
+                self._entries.move_to_end(key)
+                return calendar
+        calendar = builder()
+        with self._lock:
+            self._entries[key] = calendar
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return calendar
+
+
+_calendar_cache = _CalendarCache()
+
+
+def get_assignment_calendar(assignment, template):
+    """Returns the cached calendar index for an assignment, rebuilt whenever its schedule inputs change."""
+    key = (
+        'assignment', assignment.id, assignment.start_date, assignment.enabled_days,
+        assignment.template_version_id or (template.id, template.updated_at),
+    )
+    return _calendar_cache.get_or_build(key, lambda: build_assignment_calendar(assignment, template))
+
+
+def get_program_calendar(program, start_date):
+    key = ('program', program.id, start_date, program.weeks)
+    return _calendar_cache.get_or_build(key, lambda: build_program_calendar(program, start_date))
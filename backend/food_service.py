@@ -0,0 +1,314 @@
+"""
+Food reference data: bulk import from offline datasets and fast name search.
+
+Imports stream CSV or JSON-lines files row by row and write in batches, so a
+dataset of any size is loaded with bounded memory. Rows carrying an
+external_id update the food previously imported under that id.
+
+Search runs against an in-memory index rebuilt once per catalog version:
+a sorted token list answers prefix queries by bisection, and query tokens
+with no prefix match fall back to trigram similarity against the vocabulary
+to tolerate misspellings. Results are boosted by how often the client has
+logged each food recently.
+"""
+import bisect
+import csv
+import io
+import json
+import threading
+import unicodedata
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, update
+
+from .models import db, Food, NutritionLog
+from .nutrition_rollups import ROLLUP_FIELDS
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+USAGE_LOOKBACK_DAYS = 90
+TRIGRAM_MIN_SIMILARITY = 0.3
+
+# Accepted source column names for each Food field; nutrient values are per 100 g
+COLUMN_ALIASES = {
+    'external_id': ('external_id', 'id', 'fdc_id', 'code', 'food_id'),
+    'name': ('name', 'description', 'food_name', 'product_name'),
+    'brand': ('brand', 'brands', 'brand_owner', 'brand_name'),
+    'calories': ('calories', 'energy_kcal', 'kcal', 'energy-kcal_100g'),
+    'protein': ('protein', 'protein_g', 'proteins_100g'),
+    'carbs': ('carbs', 'carbohydrates', 'carbohydrate_g', 'carbohydrates_100g'),
+    'fat': ('fat', 'fat_g', 'total_fat', 'fat_100g'),
+    'fiber': ('fiber', 'fibre', 'fiber_g', 'fiber_100g'),
+    'sugar': ('sugar', 'sugars', 'sugar_g', 'sugars_100g'),
+    'sodium': ('sodium', 'sodium_mg', 'sodium_100g'),
+    'serving_size_g': ('serving_size_g', 'serving_g', 'serving_quantity'),
+}
+# Source columns in a different unit than the Food column, with the factor to convert them;
+# Open Food Facts reports sodium in grams while Food.sodium is in milligrams
+ALIAS_SCALE = {
+    'sodium_100g': 1000,
+}
+
+
+def _parse_food_row(raw):
+    """Maps a source row onto Food columns. Raises ValueError for unusable rows."""
+    row = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+
+    def pick_with_alias(field):
+        for alias in COLUMN_ALIASES[field]:
+            value = row.get(alias)
+            if value not in (None, ''):
+                return value, alias
+        return None, None
+
+    def pick(field):
+        return pick_with_alias(field)[0]
+
+    name = pick('name')
+    if not name or not str(name).strip():
+        raise ValueError("missing name")
+    food = {
+        'external_id': str(pick('external_id')).strip() if pick('external_id') is not None else None,
+        'name': str(name).strip()[:200],
+        'brand': str(pick('brand')).strip()[:200] if pick('brand') is not None else None,
+    }
+    for field in ROLLUP_FIELDS + ('serving_size_g',):
+        value, alias = pick_with_alias(field)
+        try:
+            number = float(value) * ALIAS_SCALE.get(alias, 1) if value is not None else None
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {field}: {value!r}")
+        if number is not None and number < 0:
+            raise ValueError(f"negative {field}")
+        food[field] = number if field == 'serving_size_g' else (number or 0.0)
+    return food
+
+
+def _iter_source_rows(stream, fmt):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        # Data starts on line 2, after the header
+        for line_number, raw in enumerate(csv.DictReader(text), start=2):
+            yield line_number, raw
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+            continue
+        yield line_number, raw if isinstance(raw, dict) else ValueError("expected a JSON object")
+
+
+def _write_batch(batch):
+    """Inserts new foods and updates re-imported ones (matched on external_id). Returns (inserted, updated)."""
+    external_ids = [f['external_id'] for f in batch if f['external_id']]
+    existing = dict(db.session.query(Food.external_id, Food.id)
+                    .filter(Food.external_id.in_(external_ids)).all()) if external_ids else {}
+    inserts, updates = [], []
+    for food in batch:
+        food_id = existing.get(food['external_id'])
+        if food_id:
+            updates.append({**food, 'id': food_id})
+        else:
+            inserts.append({**food, 'id': f"food_{uuid.uuid4()}"})
+    if inserts:
+        db.session.execute(db.insert(Food), inserts)
+    if updates:
+        db.session.execute(update(Food), updates)
+    db.session.commit()
+    return len(inserts), len(updates)
+
+
+def import_foods(stream, fmt='csv', batch_size=IMPORT_BATCH_SIZE):
+    """
+    Streams foods from a binary file object in 'csv' or 'jsonl' format and
+    writes them in committed batches. Returns counts plus the first
+    MAX_REPORTED_ERRORS row errors.
+    """
+    summary = {'inserted': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    batch = {}
+    anonymous = 0
+
+    def flush():
+        inserted, updated = _write_batch(list(batch.values()))
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        batch.clear()
+
+    for line_number, raw in _iter_source_rows(stream, fmt):
+        try:
+            if isinstance(raw, Exception):
+                raise ValueError(str(raw))
+            food = _parse_food_row(raw)
+        except ValueError as e:
+            summary['error_count'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+        # Within a batch the last row for an external_id wins
+        if food['external_id']:
+            key = food['external_id']
+        else:
+            anonymous += 1
+            key = ('anonymous', anonymous)
+        batch[key] = food
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return summary
+
+
+def import_foods_file(path, batch_size=IMPORT_BATCH_SIZE):
+    """Imports a dataset file from disk; the format follows the extension (.csv, else JSON lines)."""
+    fmt = 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+    with open(path, 'rb') as f:
+        return import_foods(f, fmt, batch_size)
+
+
+def normalize_food_text(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearchIndex:
+    def __init__(self, rows):
+        """`rows` are (id, name, brand) tuples."""
+        self.ids = []
+        token_postings = {}
+        first_token_postings = {}
+        token_counts = []
+        for i, (food_id, name, brand) in enumerate(rows):
+            self.ids.append(food_id)
+            tokens = normalize_food_text(name).split()
+            for token in set(tokens + normalize_food_text(brand).split()):
+                token_postings.setdefault(token, []).append(i)
+            if tokens:
+                first_token_postings.setdefault(tokens[0], []).append(i)
+            token_counts.append(max(len(tokens), 1))
+
+        def freeze_postings(postings):
+            keys = sorted(postings)
+            return keys, [np.array(postings[k], dtype=np.int32) for k in keys]
+
+        self._tokens, self._token_postings = freeze_postings(token_postings)
+        self._first_tokens, self._first_token_postings = freeze_postings(first_token_postings)
+        self._token_counts = np.array(token_counts, dtype=float)
+        self._positions = {food_id: i for i, food_id in enumerate(self.ids)}
+
+        # Trigrams over the vocabulary (not every food) for typo-tolerant token matching
+        trigram_postings = {}
+        vocabulary_trigram_counts = []
+        for t, token in enumerate(self._tokens):
+            trigrams = _trigrams(token)
+            vocabulary_trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                trigram_postings.setdefault(trigram, []).append(t)
+        self._trigram_postings = {k: np.array(v, dtype=np.int32) for k, v in trigram_postings.items()}
+        self._vocabulary_trigram_counts = np.array(vocabulary_trigram_counts, dtype=float)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _prefix_postings(keys, postings, prefix):
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, prefix + '\uffff')
+        if lo == hi:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(postings[lo:hi]))
+
+    def _similar_token_postings(self, token):
+        """Foods containing a vocabulary token within TRIGRAM_MIN_SIMILARITY of `token`, plus the best similarity."""
+        query_trigrams = _trigrams(token)
+        postings = [self._trigram_postings[t] for t in query_trigrams if t in self._trigram_postings]
+        if not postings:
+            return np.empty(0, dtype=np.int32), 0.0
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._tokens)).astype(float)
+        similar = np.flatnonzero(shared)
+        similarity = shared[similar] / (len(query_trigrams) + self._vocabulary_trigram_counts[similar] - shared[similar])
+        keep = similarity >= TRIGRAM_MIN_SIMILARITY
+        if not keep.any():
+            return np.empty(0, dtype=np.int32), 0.0
+        foods = np.unique(np.concatenate([self._token_postings[t] for t in similar[keep]]))
+        return foods, float(similarity[keep].max())
+
+    def search(self, query, limit=20, usage=None):
+        """Returns [(food_id, score)] best first. `usage` maps food id -> recent log count."""
+        tokens = normalize_food_text(query).split()
+        if not tokens or not self.ids:
+            return []
+
+        # Every query token must match a food token, by prefix or failing that by trigram similarity
+        candidates = None
+        match_quality = 1.0
+        for token in tokens:
+            matches = self._prefix_postings(self._tokens, self._token_postings, token)
+            if not matches.size:
+                matches, similarity = self._similar_token_postings(token)
+                match_quality *= similarity
+            candidates = matches if candidates is None else np.intersect1d(candidates, matches, assume_unique=True)
+            if not candidates.size:
+                return []
+
+        # Exact/prefix hits outrank fuzzy ones; shorter names and leading-word matches rank higher
+        scores = 1.0 + match_quality + 1.0 / self._token_counts[candidates]
+        leading = self._prefix_postings(self._first_tokens, self._first_token_postings, tokens[0])
+        scores = scores + 0.5 * np.isin(candidates, leading, assume_unique=True)
+
+        if usage:
+            used = [(self._positions[f], count) for f, count in usage.items() if f in self._positions]
+            if used:
+                boost = np.zeros(len(self.ids))
+                positions, counts = zip(*used)
+                boost[list(positions)] = np.log1p(counts)
+                scores = scores + boost[candidates]
+
+        if candidates.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return [(self.ids[candidates[i]], round(float(scores[i]), 3)) for i in order]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_food_index(catalog_version):
+    """Returns the search index, rebuilding it once per food catalog version."""
+    global _index, _index_version
+    with _index_lock:
+        if _index is None or _index_version != catalog_version:
+            rows = db.session.query(Food.id, Food.name, Food.brand).all()
+            _index = FoodSearchIndex(rows)
+            _index_version = catalog_version
+        return _index
+
+
+def client_food_usage(client_id, days=USAGE_LOOKBACK_DAYS):
+    """{food_id: times logged} for the client's recent food-linked logs."""
+    rows = db.session.query(NutritionLog.food_id, func.count(NutritionLog.id)) \
+        .filter(NutritionLog.client_id == client_id,
+                NutritionLog.food_id.isnot(None),
+                NutritionLog.log_date >= date.today() - timedelta(days=days)) \
+        .group_by(NutritionLog.food_id) \
+        .all()
+    return dict(rows)
+
+
+def food_macros(food, grams):
+    """Nutrients for `grams` of a food, rounded for storage in NutritionLog.macros."""
+    factor = grams / 100.0
+    return {field: round(getattr(food, field) * factor, 2) for field in ROLLUP_FIELDS}
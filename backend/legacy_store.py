@@ -0,0 +1,107 @@
+import json
+import os
+import pathlib
+import tempfile
+import threading
+
+from flask import current_app
+
+from .template_cache import freeze
+
+LEGACY_JSON_DIR = pathlib.Path(__file__).resolve().parent / 'database'
+WORKOUT_ASSIGNMENTS_PATH = LEGACY_JSON_DIR / 'workout_assignments.json'
+WORKOUT_TEMPLATES_PATH = LEGACY_JSON_DIR / 'workout_templates.json'
+
+
+class LegacyJSONFile:
+    """
+    Memoised reader for one of the pre-SQL JSON data files.
+
+    The parsed list is cached by (path, mtime, size) together with a dict index
+    on `index_key`, so lookups are O(1) and the file is only re-read when it
+    changes on disk. Records are returned as read-only views.
+    """
+
+    def __init__(self, path, index_key):
+        self.path = pathlib.Path(path)
+        self.index_key = index_key
+        self._stamp = None
+        self._records = ()
+        self._index = {}
+        self._lock = threading.RLock()
+
+    def _stat_stamp(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (str(self.path), stat.st_mtime_ns, stat.st_size)
+
+    def _set_records(self, records, stamp):
+        frozen = tuple(freeze(r) for r in records if isinstance(r, dict))
+        index = {}
+        for record in frozen:
+            # Keep the first match, as the original linear search did
+            index.setdefault(record.get(self.index_key), record)
+        self._records, self._index, self._stamp = frozen, index, stamp
+
+    def _refresh(self):
+        stamp = self._stat_stamp()
+        if stamp == self._stamp:
+            return
+        if stamp is None:
+            self._set_records([], None)
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            current_app.logger.error(f"Error reading legacy data from {self.path.name}: {e}")
+            data = []
+        self._set_records(data if isinstance(data, list) else [], stamp)
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return self._records
+
+    def get(self, *keys):
+        """Returns the first record whose index key matches any of `keys`."""
+        with self._lock:
+            self._refresh()
+            for key in keys:
+                record = self._index.get(key)
+                if record is not None:
+                    return record
+        return None
+
+    def remove_where(self, predicate):
+        """
+        Drops matching records and rewrites the file atomically (temp file + rename).
+        Returns the number of records removed.
+        """
+        with self._lock:
+            self._refresh()
+            kept = [r for r in self._records if not predicate(r)]
+            removed = len(self._records) - len(kept)
+            if removed:
+                self._write(kept)
+            return removed
+
+    def _write(self, records):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._set_records(records, self._stat_stamp())
+
+
+legacy_assignments = LegacyJSONFile(WORKOUT_ASSIGNMENTS_PATH, index_key='client_id')
+legacy_templates = LegacyJSONFile(WORKOUT_TEMPLATES_PATH, index_key='id')
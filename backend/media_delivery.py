@@ -0,0 +1,87 @@
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from .media_service import UPLOADS_ROOT
+
+ONE_DAY = 24 * 60 * 60
+ONE_YEAR = 365 * ONE_DAY
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_MAX_ETAG_ENTRIES = 4096
+
+# (path, mtime_ns, size) -> sha256 hex digest
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def file_etag(path):
+    """
+    Strong ETag for a file, derived from a SHA-256 of its contents.
+    Digests are memoized by (path, mtime, size) so each file is hashed once per change.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _etag_lock:
+        digest = _etag_cache.get(key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _etag_lock:
+        if len(_etag_cache) >= _MAX_ETAG_ENTRIES:
+            _etag_cache.clear()
+        _etag_cache[key] = digest
+    return digest
+
+
+def _apply_cache_headers(response, etag, max_age, immutable, public):
+    response.set_etag(etag)
+    response.cache_control.max_age = max_age
+    response.cache_control.public = public
+    response.cache_control.private = not public
+    if immutable:
+        response.cache_control.immutable = True
+    response.accept_ranges = 'bytes'
+    return response
+
+
+def _accel_redirect_response(path, etag, max_age, immutable, public):
+    """Hands the transfer to nginx; it serves the bytes (and any Range) from an internal location."""
+    prefix = current_app.config['MEDIA_X_ACCEL_PREFIX'].rstrip('/')
+    relative = os.path.relpath(path, UPLOADS_ROOT).replace(os.sep, '/')
+    response = Response(status=200)
+    response.headers['X-Accel-Redirect'] = f"{prefix}/{relative}"
+    response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    _apply_cache_headers(response, etag, max_age, immutable, public)
+    return response.make_conditional(request)
+
+
+def send_media(directory, filename, max_age=ONE_DAY, immutable=False, public=True):
+    """
+    Serves a media file with strong ETags, tuned Cache-Control and HTTP Range support.
+
+    When MEDIA_X_ACCEL_PREFIX is configured the body is offloaded to nginx via
+    X-Accel-Redirect; when USE_X_SENDFILE is set Flask emits X-Sendfile instead.
+    Either way the bytes never stream through Python in production.
+    """
+    path = safe_join(str(directory), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    path = os.path.abspath(path)
+    etag = file_etag(path)
+
+    if current_app.config.get('MEDIA_X_ACCEL_PREFIX') and path.startswith(str(UPLOADS_ROOT) + os.sep):
+        return _accel_redirect_response(path, etag, max_age, immutable, public)
+
+    response = send_file(path, conditional=True, etag=etag, max_age=max_age)
+    return _apply_cache_headers(response, etag, max_age, immutable, public)
@@ -0,0 +1,271 @@
+import io
+import os
+import pathlib
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, ImageSequence
+
+UPLOADS_ROOT = pathlib.Path(__file__).resolve().parent / 'uploads'
+EXERCISE_MEDIA_ROOT = UPLOADS_ROOT / 'exercise_media'
+
+# variant name -> (filename suffix, mimetype)
+MEDIA_VARIANTS = {
+    'poster': ('.poster.jpg', 'image/jpeg'),
+    'thumb': ('.thumb.webp', 'image/webp'),
+    'webp': ('.anim.webp', 'image/webp'),
+    'mp4': ('.mp4', 'video/mp4'),
+}
+
+THUMBNAIL_SIZE = (160, 160)
+ORIGINAL_EXTENSIONS = {'.gif'}
+
+# Progress photo variant name -> (file extension, longest edge in px, WebP quality)
+PHOTO_VARIANTS = {
+    'thumb': ('.webp', 320, 70),
+    'medium': ('.webp', 1280, 80),
+    # Metadata-free stand-in for the original, which is never handed out
+    'full': ('.webp', 2560, 85),
+}
+
+
+def variant_path(original_path, variant):
+    """Returns the sibling path a variant of `original_path` is stored at."""
+    original_path = pathlib.Path(original_path)
+    suffix, _ = MEDIA_VARIANTS[variant]
+    return original_path.with_name(original_path.stem + suffix)
+
+
+def _is_variant_file(path):
+    return any(path.name.endswith(suffix) for suffix, _ in MEDIA_VARIANTS.values())
+
+
+def _is_fresh(target, source):
+    """A variant is up to date when it exists and is not older than its source."""
+    return target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+
+
+def _save_atomic(target, writer):
+    """Writes through a temp file and renames so readers never see a partial variant."""
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _write_poster(image, target):
+    image.seek(0)
+    frame = image.convert('RGB')
+    _save_atomic(target, lambda p: frame.save(p, format='JPEG', quality=80, optimize=True))
+
+
+def _write_thumbnail(image, target):
+    image.seek(0)
+    frame = image.convert('RGB')
+    frame.thumbnail(THUMBNAIL_SIZE)
+    _save_atomic(target, lambda p: frame.save(p, format='WEBP', quality=70))
+
+
+def _write_animated_webp(image, target):
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        frames.append(frame.convert('RGBA'))
+        durations.append(frame.info.get('duration', image.info.get('duration', 100)))
+    if not frames:
+        return
+    _save_atomic(target, lambda p: frames[0].save(
+        p, format='WEBP', save_all=True, append_images=frames[1:],
+        duration=durations, loop=0, quality=60, method=4))
+
+
+def _write_mp4(source, target):
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return False
+
+    def run(tmp_path):
+        subprocess.run(
+            [ffmpeg, '-y', '-loglevel', 'error', '-i', str(source),
+             '-movflags', 'faststart', '-pix_fmt', 'yuv420p',
+             # yuv420p needs even dimensions
+             '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
+             '-f', 'mp4', str(tmp_path)],
+            check=True, timeout=120,
+        )
+
+    _save_atomic(target, run)
+    return True
+
+
+def generate_variants_for_file(source, force=False):
+    """
+    Generates every missing or stale variant for a single original media file.
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    source = pathlib.Path(source)
+    result = {'file': source.name, 'generated': [], 'skipped': [], 'error': None}
+    try:
+        pending = [v for v in MEDIA_VARIANTS
+                   if force or not _is_fresh(variant_path(source, v), source)]
+        result['skipped'] = [v for v in MEDIA_VARIANTS if v not in pending]
+        if not pending:
+            return result
+
+        if {'poster', 'thumb', 'webp'} & set(pending):
+            with Image.open(source) as image:
+                if 'poster' in pending:
+                    _write_poster(image, variant_path(source, 'poster'))
+                    result['generated'].append('poster')
+                if 'thumb' in pending:
+                    _write_thumbnail(image, variant_path(source, 'thumb'))
+                    result['generated'].append('thumb')
+                if 'webp' in pending:
+                    _write_animated_webp(image, variant_path(source, 'webp'))
+                    result['generated'].append('webp')
+
+        if 'mp4' in pending:
+            if _write_mp4(source, variant_path(source, 'mp4')):
+                result['generated'].append('mp4')
+            else:
+                result['skipped'].append('mp4')
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def render_photo_variants(stream):
+    """
+    Renders resized WebP variants of a progress photo, returning {variant: bytes}.
+    Orientation is applied from EXIF and the metadata (GPS, device) is dropped.
+    """
+    largest = max(size for _, size, _ in PHOTO_VARIANTS.values())
+    with Image.open(stream) as image:
+        # Lets JPEG decode at a reduced scale instead of full sensor resolution
+        image.draft('RGB', (largest, largest))
+        upright = ImageOps.exif_transpose(image).convert('RGB')
+    rendered = {}
+    for variant, (_, size, quality) in sorted(PHOTO_VARIANTS.items(), key=lambda v: -v[1][1]):
+        upright.thumbnail((size, size))
+        buffer = io.BytesIO()
+        upright.save(buffer, format='WEBP', quality=quality, exif=b'')
+        rendered[variant] = buffer.getvalue()
+    return rendered
+
+
+def find_original_media(media_root=EXERCISE_MEDIA_ROOT):
+    media_root = pathlib.Path(media_root)
+    if not media_root.exists():
+        return []
+    return sorted(
+        p for p in media_root.iterdir()
+        if p.is_file() and p.suffix.lower() in ORIGINAL_EXTENSIONS and not _is_variant_file(p)
+    )
+
+
+def _tally(summary, result):
+    if result['error']:
+        summary['failed'].append({'file': result['file'], 'error': result['error']})
+    elif result['generated']:
+        summary['generated'] += 1
+    else:
+        summary['up_to_date'] += 1
+
+
+def generate_exercise_media_variants(media_root=EXERCISE_MEDIA_ROOT, max_workers=None, force=False):
+    """
+    Generates poster, thumbnail and compact animated variants for every
+    exercise GIF in `media_root` using a process pool. Safe to re-run: files
+    whose variants are already up to date are skipped. Blocks until done, so
+    it is for the command line; the API queues runs instead.
+    """
+    sources = find_original_media(media_root)
+    summary = {'processed': len(sources), 'generated': 0, 'up_to_date': 0, 'failed': []}
+    if not sources:
+        return summary
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for result in pool.map(generate_variants_for_file, sources, [force] * len(sources), chunksize=8):
+            _tally(summary, result)
+    return summary
+
+
+_variant_pool = None
+_variant_job = None
+# Reentrant: a job finishing before add_done_callback returns records itself on the submitting thread
+_variant_lock = threading.RLock()
+
+
+def _record_variant_result(source, future):
+    # Runs on the executor's management thread; only updates the in-memory job summary
+    try:
+        result = future.result()
+    except Exception as e:
+        result = {'file': source.name, 'generated': [], 'error': str(e)}
+    with _variant_lock:
+        _tally(_variant_job, result)
+        _variant_job['pending'] -= 1
+        if not _variant_job['pending']:
+            _variant_job['status'] = 'done'
+
+
+def queue_exercise_media_variants(media_root=EXERCISE_MEDIA_ROOT, force=False):
+    """
+    Queues variant generation for every exercise GIF on a shared process pool
+    and returns the run's summary immediately. While a run is in progress it
+    is returned instead of starting another.
+    """
+    global _variant_pool, _variant_job
+    with _variant_lock:
+        if _variant_job and _variant_job['status'] == 'running':
+            return exercise_media_variants_status()
+        sources = find_original_media(media_root)
+        _variant_job = {'status': 'running' if sources else 'done', 'processed': len(sources),
+                        'pending': len(sources), 'generated': 0, 'up_to_date': 0, 'failed': []}
+        if sources and _variant_pool is None:
+            _variant_pool = ProcessPoolExecutor()
+        for source in sources:
+            future = _variant_pool.submit(generate_variants_for_file, source, force)
+            future.add_done_callback(lambda f, source=source: _record_variant_result(source, f))
+        return exercise_media_variants_status()
+
+
+def exercise_media_variants_status():
+    """Summary of the latest queued run, or None when none was queued by this process."""
+    with _variant_lock:
+        return dict(_variant_job, failed=list(_variant_job['failed'])) if _variant_job else None
+
+
+def resolve_media_variant(media_root, filename, variant=None, accept_webp=False):
+    """
+    Picks the file to serve for an exercise media request.
+
+    An explicit `variant` wins; otherwise clients that advertise WebP support get
+    the animated WebP. Falls back to the original when the variant has not been
+    generated yet. Returns (filename, negotiated) where `negotiated` is True when
+    the choice depended on the Accept header.
+    """
+    original = pathlib.Path(media_root) / filename
+    if variant == 'original':
+        return filename, False
+    if variant in MEDIA_VARIANTS:
+        candidate = variant_path(original, variant)
+        if candidate.exists():
+            return str(pathlib.PurePosixPath(filename).with_name(candidate.name)), False
+        return filename, False
+    if accept_webp and original.suffix.lower() in ORIGINAL_EXTENSIONS:
+        candidate = variant_path(original, 'webp')
+        if candidate.exists():
+            return str(pathlib.PurePosixPath(filename).with_name(candidate.name)), True
+        return filename, True
+    return filename, False
+
+
+if __name__ == '__main__':
+    print("Generating exercise media variants...")
+    print(generate_exercise_media_variants())
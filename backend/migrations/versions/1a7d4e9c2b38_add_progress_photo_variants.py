@@ -0,0 +1,30 @@
+"""Add variants and processing status to progress_photo
+
+Revision ID: 1a7d4e9c2b38
+Revises: f08c2d6b9e51
+Create Date: 2026-10-19 18:34:05.771920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a7d4e9c2b38'
+down_revision = 'f08c2d6b9e51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variants', sa.Text(), nullable=True, server_default='{}'))
+        # Existing photos are picked up by POST /api/progress-photos/process-pending
+        batch_op.add_column(sa.Column('processing_status', sa.String(length=20), nullable=True,
+                                      server_default='pending'))
+
+
+def downgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.drop_column('processing_status')
+        batch_op.drop_column('variants')
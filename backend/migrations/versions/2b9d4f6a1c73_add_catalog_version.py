@@ -0,0 +1,28 @@
+"""Add catalog_version table
+
+Revision ID: 2b9d4f6a1c73
+Revises: 8e2a6f1d4c90
+Create Date: 2026-10-19 19:02:47.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b9d4f6a1c73'
+down_revision = '8e2a6f1d4c90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name', name=op.f('pk_catalog_version'))
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_version')
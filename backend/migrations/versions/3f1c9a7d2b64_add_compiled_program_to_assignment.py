@@ -0,0 +1,28 @@
+"""Add materialised effective program to program_assignment
+
+Revision ID: 3f1c9a7d2b64
+Revises: 8bd34b1e1201
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = '8bd34b1e1201'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('compiled_program', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('compiled_etag', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.drop_column('compiled_etag')
+        batch_op.drop_column('compiled_program')
@@ -0,0 +1,26 @@
+"""Add created_at to workout_log
+
+Revision ID: 4a6c8e0b2d51
+Revises: 7d3e5b9a2f18
+Create Date: 2026-10-19 20:41:09.330516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a6c8e0b2d51'
+down_revision = '7d3e5b9a2f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('workout_log', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
@@ -0,0 +1,74 @@
+"""Add nutrition_daily_total rollup table
+
+Revision ID: 4d8a61f0b7e3
+Revises: 7b2e94d1c3a8
+Create Date: 2026-10-19 15:02:44.530918
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8a61f0b7e3'
+down_revision = '7b2e94d1c3a8'
+branch_labels = None
+depends_on = None
+
+ROLLUP_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+
+nutrition_log_table = sa.table('nutrition_log',
+    sa.column('client_id', sa.String),
+    sa.column('log_date', sa.Date),
+    sa.column('macros', sa.Text),
+)
+
+
+def _macro_values(raw):
+    # Kept local so the migration doesn't depend on application code
+    try:
+        macros = json.loads(raw) if raw else {}
+    except (json.JSONDecodeError, TypeError):
+        macros = {}
+    if not isinstance(macros, dict):
+        macros = {}
+    values = {}
+    for field in ROLLUP_FIELDS:
+        try:
+            values[field] = float(macros.get(field) or 0)
+        except (TypeError, ValueError):
+            values[field] = 0.0
+    return values
+
+
+def upgrade():
+    total_table = op.create_table('nutrition_daily_total',
+    sa.Column('client_id', sa.String(), nullable=False),
+    sa.Column('log_date', sa.Date(), nullable=False),
+    *[sa.Column(field, sa.Float(), nullable=False) for field in ROLLUP_FIELDS],
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], name=op.f('fk_nutrition_daily_total_client_id_client')),
+    sa.PrimaryKeyConstraint('client_id', 'log_date', name=op.f('pk_nutrition_daily_total'))
+    )
+    with op.batch_alter_table('nutrition_log', schema=None) as batch_op:
+        batch_op.create_index('ix_nutrition_log_client_date', ['client_id', 'log_date'], unique=False)
+
+    conn = op.get_bind()
+    totals = {}
+    for row in conn.execute(sa.select(nutrition_log_table)):
+        total = totals.setdefault((row.client_id, row.log_date),
+                                  {'client_id': row.client_id, 'log_date': row.log_date, 'entry_count': 0,
+                                   **{field: 0.0 for field in ROLLUP_FIELDS}})
+        total['entry_count'] += 1
+        for field, value in _macro_values(row.macros).items():
+            total[field] += value
+    if totals:
+        op.bulk_insert(total_table, list(totals.values()))
+
+
+def downgrade():
+    with op.batch_alter_table('nutrition_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_nutrition_log_client_date')
+    op.drop_table('nutrition_daily_total')
@@ -0,0 +1,26 @@
+"""Add servings to recipe
+
+Revision ID: 5e8b1c47a902
+Revises: d3a7c85e2f46
+Create Date: 2026-10-19 17:22:10.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b1c47a902'
+down_revision = 'd3a7c85e2f46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('servings', sa.Float(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.drop_column('servings')
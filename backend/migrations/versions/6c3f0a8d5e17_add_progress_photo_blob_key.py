@@ -0,0 +1,26 @@
+"""Add blob_key to progress_photo
+
+Revision ID: 6c3f0a8d5e17
+Revises: 1a7d4e9c2b38
+Create Date: 2026-10-19 19:12:44.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c3f0a8d5e17'
+down_revision = '1a7d4e9c2b38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_key', sa.String(length=200), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.drop_column('blob_key')
@@ -0,0 +1,26 @@
+"""Index workout_log by client and date
+
+Revision ID: 7b2e94d1c3a8
+Revises: e51b3c8a9f02
+Create Date: 2026-10-19 14:20:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e94d1c3a8'
+down_revision = 'e51b3c8a9f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_log', schema=None) as batch_op:
+        batch_op.create_index('ix_workout_log_client_date', ['client_id', 'actual_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workout_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_log_client_date')
@@ -0,0 +1,26 @@
+"""Add compiled_version to program_assignment
+
+Revision ID: 7d3e5b9a2f18
+Revises: 2b9d4f6a1c73
+Create Date: 2026-10-19 20:14:31.552908
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e5b9a2f18'
+down_revision = '2b9d4f6a1c73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('compiled_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.drop_column('compiled_version')
@@ -0,0 +1,49 @@
+"""Store resources in blob storage and add resumable resource uploads
+
+Revision ID: 8e2a6f1d4c90
+Revises: 6c3f0a8d5e17
+Create Date: 2026-10-19 19:47:21.086315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2a6f1d4c90'
+down_revision = '6c3f0a8d5e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resource', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_key', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('content_type', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+
+    op.create_table('resource_upload',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('filename', sa.String(length=200), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('total_size', sa.BigInteger(), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('received', sa.BigInteger(), nullable=False),
+    sa.Column('parts', sa.Text(), nullable=False),
+    sa.Column('resource_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], name=op.f('fk_resource_upload_resource_id_resource')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_resource_upload'))
+    )
+
+
+def downgrade():
+    op.drop_table('resource_upload')
+    with op.batch_alter_table('resource', schema=None) as batch_op:
+        batch_op.drop_column('sha256')
+        batch_op.drop_column('size')
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('blob_key')
@@ -0,0 +1,47 @@
+"""Add food table and nutrition_log.food_id
+
+Revision ID: 9c5f2a7e8d13
+Revises: 4d8a61f0b7e3
+Create Date: 2026-10-19 15:41:19.204771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c5f2a7e8d13'
+down_revision = '4d8a61f0b7e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('food',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('external_id', sa.String(length=100), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('brand', sa.String(length=200), nullable=True),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.Column('protein', sa.Float(), nullable=False),
+    sa.Column('carbs', sa.Float(), nullable=False),
+    sa.Column('fat', sa.Float(), nullable=False),
+    sa.Column('fiber', sa.Float(), nullable=False),
+    sa.Column('sugar', sa.Float(), nullable=False),
+    sa.Column('sodium', sa.Float(), nullable=False),
+    sa.Column('serving_size_g', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_food')),
+    sa.UniqueConstraint('external_id', name=op.f('uq_food_external_id'))
+    )
+    with op.batch_alter_table('nutrition_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('food_id', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_nutrition_log_food_id'), ['food_id'], unique=False)
+        batch_op.create_foreign_key(batch_op.f('fk_nutrition_log_food_id_food'), 'food', ['food_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('nutrition_log', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_nutrition_log_food_id_food'), type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_nutrition_log_food_id'))
+        batch_op.drop_column('food_id')
+    op.drop_table('food')
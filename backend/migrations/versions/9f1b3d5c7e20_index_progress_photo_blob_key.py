@@ -0,0 +1,26 @@
+"""Index progress_photo by blob_key
+
+Revision ID: 9f1b3d5c7e20
+Revises: 4a6c8e0b2d51
+Create Date: 2026-10-19 21:08:52.640117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f1b3d5c7e20'
+down_revision = '4a6c8e0b2d51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_progress_photo_blob_key'), ['blob_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('progress_photo', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_progress_photo_blob_key'))
@@ -0,0 +1,65 @@
+"""Replace group.client_ids JSON with a group_membership join table
+
+Revision ID: a94e6b1c0d27
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-19 10:03:21.540117
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a94e6b1c0d27'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+group_table = sa.table('group', sa.column('id', sa.String), sa.column('client_ids', sa.Text))
+client_table = sa.table('client', sa.column('id', sa.String))
+membership_table = sa.table('group_membership', sa.column('group_id', sa.String), sa.column('client_id', sa.String))
+
+
+def upgrade():
+    op.create_table('group_membership',
+    sa.Column('group_id', sa.String(), nullable=False),
+    sa.Column('client_id', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], name=op.f('fk_group_membership_client_id_client')),
+    sa.ForeignKeyConstraint(['group_id'], ['group.id'], name=op.f('fk_group_membership_group_id_group')),
+    sa.PrimaryKeyConstraint('group_id', 'client_id', name=op.f('pk_group_membership'))
+    )
+    op.create_index('ix_group_membership_client_id', 'group_membership', ['client_id'], unique=False)
+
+    conn = op.get_bind()
+    existing_clients = {row.id for row in conn.execute(sa.select(client_table.c.id))}
+    rows = []
+    for group in conn.execute(sa.select(group_table.c.id, group_table.c.client_ids)):
+        try:
+            client_ids = json.loads(group.client_ids) if group.client_ids else []
+        except (json.JSONDecodeError, TypeError):
+            client_ids = []
+        for client_id in dict.fromkeys(client_ids):
+            if client_id in existing_clients:
+                rows.append({'group_id': group.id, 'client_id': client_id})
+    if rows:
+        op.bulk_insert(membership_table, rows)
+
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.drop_column('client_ids')
+
+
+def downgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('client_ids', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    members = {}
+    for row in conn.execute(sa.select(membership_table.c.group_id, membership_table.c.client_id)):
+        members.setdefault(row.group_id, []).append(row.client_id)
+    for group_id, client_ids in members.items():
+        conn.execute(group_table.update().where(group_table.c.id == group_id).values(client_ids=json.dumps(client_ids)))
+
+    op.drop_index('ix_group_membership_client_id', table_name='group_membership')
+    op.drop_table('group_membership')
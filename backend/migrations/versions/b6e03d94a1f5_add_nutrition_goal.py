@@ -0,0 +1,37 @@
+"""Add nutrition_goal table
+
+Revision ID: b6e03d94a1f5
+Revises: 9c5f2a7e8d13
+Create Date: 2026-10-19 16:12:05.617342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e03d94a1f5'
+down_revision = '9c5f2a7e8d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('nutrition_goal',
+    sa.Column('client_id', sa.String(), nullable=False),
+    sa.Column('mode', sa.String(length=10), nullable=False),
+    sa.Column('goal_type', sa.String(length=10), nullable=True),
+    sa.Column('calories', sa.Float(), nullable=True),
+    sa.Column('protein', sa.Float(), nullable=True),
+    sa.Column('carbs', sa.Float(), nullable=True),
+    sa.Column('fat', sa.Float(), nullable=True),
+    sa.Column('fiber', sa.Float(), nullable=True),
+    sa.Column('water', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], name=op.f('fk_nutrition_goal_client_id_client')),
+    sa.PrimaryKeyConstraint('client_id', name=op.f('pk_nutrition_goal'))
+    )
+
+
+def downgrade():
+    op.drop_table('nutrition_goal')
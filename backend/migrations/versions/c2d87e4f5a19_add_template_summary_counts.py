@@ -0,0 +1,66 @@
+"""Add day and exercise counts to workout_template
+
+Revision ID: c2d87e4f5a19
+Revises: a94e6b1c0d27
+Create Date: 2026-10-19 10:41:08.772390
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d87e4f5a19'
+down_revision = 'a94e6b1c0d27'
+branch_labels = None
+depends_on = None
+
+template_table = sa.table('workout_template',
+    sa.column('id', sa.String),
+    sa.column('days', sa.Text),
+    sa.column('day_count', sa.Integer),
+    sa.column('exercise_count', sa.Integer),
+)
+
+
+def _summarize(raw_days):
+    # Kept local so the migration doesn't depend on application code
+    try:
+        days = json.loads(raw_days) if raw_days else []
+    except (json.JSONDecodeError, TypeError):
+        days = []
+    if not isinstance(days, list):
+        days = []
+    def count(exercises):
+        # Same rule as template_cache.summarize_days: only dict entries are exercises
+        return sum(1 for exercise in exercises or [] if isinstance(exercise, dict))
+
+    exercise_count = 0
+    for day in days:
+        if not isinstance(day, dict):
+            continue
+        exercise_count += count(day.get('exercises'))
+        for group in day.get('groups') or []:
+            if isinstance(group, dict):
+                exercise_count += count(group.get('exercises'))
+    return len(days), exercise_count
+
+
+def upgrade():
+    with op.batch_alter_table('workout_template', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('exercise_count', sa.Integer(), nullable=True))
+
+    conn = op.get_bind()
+    for row in conn.execute(sa.select(template_table.c.id, template_table.c.days)).fetchall():
+        day_count, exercise_count = _summarize(row.days)
+        conn.execute(template_table.update().where(template_table.c.id == row.id)
+                     .values(day_count=day_count, exercise_count=exercise_count))
+
+
+def downgrade():
+    with op.batch_alter_table('workout_template', schema=None) as batch_op:
+        batch_op.drop_column('exercise_count')
+        batch_op.drop_column('day_count')
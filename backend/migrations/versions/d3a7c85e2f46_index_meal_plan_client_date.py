@@ -0,0 +1,26 @@
+"""Index meal_plan by client and date
+
+Revision ID: d3a7c85e2f46
+Revises: b6e03d94a1f5
+Create Date: 2026-10-19 16:48:52.301667
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7c85e2f46'
+down_revision = 'b6e03d94a1f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meal_plan', schema=None) as batch_op:
+        batch_op.create_index('ix_meal_plan_client_date', ['client_id', 'assigned_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('meal_plan', schema=None) as batch_op:
+        batch_op.drop_index('ix_meal_plan_client_date')
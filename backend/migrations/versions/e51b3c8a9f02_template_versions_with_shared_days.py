@@ -0,0 +1,92 @@
+"""Add copy-on-write template versions with content-addressed days
+
+Revision ID: e51b3c8a9f02
+Revises: c2d87e4f5a19
+Create Date: 2026-10-19 11:26:54.305811
+
+"""
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e51b3c8a9f02'
+down_revision = 'c2d87e4f5a19'
+branch_labels = None
+depends_on = None
+
+template_table = sa.table('workout_template',
+    sa.column('id', sa.String), sa.column('name', sa.String), sa.column('days', sa.Text))
+day_table = sa.table('template_day', sa.column('hash', sa.String), sa.column('content', sa.Text))
+version_table = sa.table('workout_template_version',
+    sa.column('id', sa.String), sa.column('template_id', sa.String), sa.column('version', sa.Integer),
+    sa.column('name', sa.String), sa.column('day_hashes', sa.Text), sa.column('created_at', sa.DateTime))
+assignment_table = sa.table('program_assignment',
+    sa.column('template_id', sa.String), sa.column('template_version_id', sa.String))
+
+
+def _canonical(day):
+    # Must match template_versions.canonical_day_json
+    return json.dumps(day, sort_keys=True, separators=(',', ':'))
+
+
+def upgrade():
+    op.create_table('template_day',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('hash', name=op.f('pk_template_day'))
+    )
+    op.create_table('workout_template_version',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('template_id', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('day_hashes', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['template_id'], ['workout_template.id'], name=op.f('fk_workout_template_version_template_id_workout_template')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_workout_template_version')),
+    sa.UniqueConstraint('template_id', 'version', name='_template_version_uc')
+    )
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template_version_id', sa.String(), nullable=True))
+        batch_op.create_foreign_key(batch_op.f('fk_program_assignment_template_version_id_workout_template_version'),
+                                    'workout_template_version', ['template_version_id'], ['id'])
+
+    # Snapshot every existing template as version 1 and pin its assignments to it
+    conn = op.get_bind()
+    stored_days = set()
+    for template in conn.execute(sa.select(template_table.c.id, template_table.c.name, template_table.c.days)).fetchall():
+        try:
+            days = json.loads(template.days) if template.days else []
+        except (json.JSONDecodeError, TypeError):
+            days = []
+        if not isinstance(days, list):
+            days = []
+        hashes = []
+        for day in days:
+            content = _canonical(day)
+            day_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            if day_hash not in stored_days:
+                conn.execute(day_table.insert().values(hash=day_hash, content=content))
+                stored_days.add(day_hash)
+            hashes.append(day_hash)
+        version_id = f"wtv_{uuid.uuid4()}"
+        conn.execute(version_table.insert().values(
+            id=version_id, template_id=template.id, version=1, name=template.name or 'Untitled Template',
+            day_hashes=json.dumps(hashes), created_at=datetime.utcnow()))
+        conn.execute(assignment_table.update()
+                     .where(assignment_table.c.template_id == template.id)
+                     .values(template_version_id=version_id))
+
+
+def downgrade():
+    with op.batch_alter_table('program_assignment', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_program_assignment_template_version_id_workout_template_version'), type_='foreignkey')
+        batch_op.drop_column('template_version_id')
+    op.drop_table('workout_template_version')
+    op.drop_table('template_day')
@@ -0,0 +1,26 @@
+"""Index body_stat by client and date
+
+Revision ID: f08c2d6b9e51
+Revises: 5e8b1c47a902
+Create Date: 2026-10-19 17:51:36.092214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f08c2d6b9e51'
+down_revision = '5e8b1c47a902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('body_stat', schema=None) as batch_op:
+        batch_op.create_index('ix_body_stat_client_date', ['client_id', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('body_stat', schema=None) as batch_op:
+        batch_op.drop_index('ix_body_stat_client_date')
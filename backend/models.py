@@ -1,4 +1,5 @@
 from .extensions import db
+from .template_cache import parse_days, summarize_days
 from sqlalchemy import MetaData
 import uuid
 from datetime import datetime, date
@@ -75,6 +76,9 @@ class WorkoutTemplate(db.Model):
     id = db.Column(db.String, primary_key=True, default=lambda: f"wkt_{uuid.uuid4()}")
     name = db.Column(db.String(100), nullable=False)
     days = db.Column(db.Text)  # Storing days structure as JSON string
+    # Denormalised from days so listings never need to load the payload
+    day_count = db.Column(db.Integer)
+    exercise_count = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_public = db.Column(db.Boolean, default=False)
@@ -90,11 +94,57 @@ class WorkoutTemplate(db.Model):
             "is_public": self.is_public,
         }
 
+    def refresh_summary(self):
+        """Recomputes the stored day and exercise counts from days."""
+        self.day_count, self.exercise_count = summarize_days(parse_days(self.days))
+
+    def to_summary_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "day_count": self.day_count,
+            "exercise_count": self.exercise_count,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "is_public": self.is_public,
+        }
+
+class TemplateDay(db.Model):
+    """A day structure stored once by content hash and shared by every template version that uses it."""
+    hash = db.Column(db.String(64), primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+
+class WorkoutTemplateVersion(db.Model):
+    """Immutable snapshot of a template; days are referenced by TemplateDay hash."""
+    __table_args__ = (db.UniqueConstraint('template_id', 'version', name='_template_version_uc'),)
+    id = db.Column(db.String, primary_key=True, default=lambda: f"wtv_{uuid.uuid4()}")
+    template_id = db.Column(db.String, db.ForeignKey('workout_template.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    day_hashes = db.Column(db.Text, nullable=False, default='[]')  # JSON list of TemplateDay hashes, in order
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    template = db.relationship('WorkoutTemplate', backref=db.backref('versions', lazy=True))
+
+    def to_dict(self):
+        import json
+        day_hashes = json.loads(self.day_hashes or '[]')
+        return {
+            'id': self.id,
+            'template_id': self.template_id,
+            'version': self.version,
+            'name': self.name,
+            'day_count': len(day_hashes),
+            'day_hashes': day_hashes,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
 class ProgramAssignment(db.Model):
     __table_args__ = (db.UniqueConstraint('client_id', 'active', name='_client_active_uc'),)
     id = db.Column(db.String, primary_key=True, default=lambda: f"pa_{uuid.uuid4()}")
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     template_id = db.Column(db.String, db.ForeignKey('workout_template.id'), nullable=False)
+    # Template version the client was assigned; later template edits don't change it
+    template_version_id = db.Column(db.String, db.ForeignKey('workout_template_version.id'))
     start_date = db.Column(db.Date, nullable=False, default=date.today)
     current_day_index = db.Column(db.Integer, default=0)
     active = db.Column(db.Boolean, default=True)
@@ -104,9 +154,16 @@ class ProgramAssignment(db.Model):
     enabled_days = db.Column(db.Text, default='[]')  # JSON array of enabled day indices
     day_customizations = db.Column(db.Text, default='{}')  # JSON of per-day customizations
     notes = db.Column(db.Text)  # Trainer notes for this client's program
+
+    # Materialised effective program (template + customisations); cleared whenever an input changes
+    compiled_program = db.Column(db.Text)
+    compiled_etag = db.Column(db.String(64))
+    # Bumped by every invalidation; a compile only stores its artifact if this hasn't moved since
+    compiled_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     client = db.relationship('Client', backref=db.backref('program_assignments', lazy=True))
     template = db.relationship('WorkoutTemplate', backref=db.backref('program_assignments', lazy=True))
+    template_version = db.relationship('WorkoutTemplateVersion')
 
     def to_dict(self):
         import json
@@ -114,6 +171,7 @@ class ProgramAssignment(db.Model):
             'id': self.id,
             'client_id': self.client_id,
             'template_id': self.template_id,
+            'template_version_id': self.template_version_id,
             'start_date': self.start_date.isoformat(),
             'active': self.active,
             'current_day_index': self.current_day_index,
@@ -124,11 +182,15 @@ class ProgramAssignment(db.Model):
         }
 
 class WorkoutLog(db.Model):
+    # Serves per-client date-range reads (calendar, history) without a table scan
+    __table_args__ = (db.Index('ix_workout_log_client_date', 'client_id', 'actual_date'),)
     id = db.Column(db.String, primary_key=True, default=lambda: f"log_{uuid.uuid4()}")
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     assignment_id = db.Column(db.String, db.ForeignKey('program_assignment.id'), nullable=False)
     day_index_completed = db.Column(db.Integer, nullable=False)
     actual_date = db.Column(db.Date, nullable=False)
+    # When the log was written; orders same-day and backdated logs (null for rows logged before it existed)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     performance_data = db.Column(db.Text, default='{}')
     client = db.relationship('Client', backref=db.backref('workout_logs', lazy=True))
     assignment = db.relationship('ProgramAssignment', backref=db.backref('workout_logs', lazy=True))
@@ -139,8 +201,10 @@ class Recipe(db.Model):
     ingredients = db.Column(db.Text, default='[]')
     instructions = db.Column(db.Text)
     macros = db.Column(db.Text, default='{}')
+    servings = db.Column(db.Float, nullable=False, default=1)  # Servings the ingredient list makes
 
 class MealPlan(db.Model):
+    __table_args__ = (db.Index('ix_meal_plan_client_date', 'client_id', 'assigned_date'),)
     id = db.Column(db.String, primary_key=True, default=lambda: f"mp_{uuid.uuid4()}")
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     recipe_id = db.Column(db.String, db.ForeignKey('recipe.id'), nullable=False)
@@ -149,13 +213,92 @@ class MealPlan(db.Model):
     recipe = db.relationship('Recipe', backref=db.backref('meal_plans', lazy=True))
 
 class NutritionLog(db.Model):
+    __table_args__ = (db.Index('ix_nutrition_log_client_date', 'client_id', 'log_date'),)
     id = db.Column(db.String, primary_key=True, default=lambda: f"nl_{uuid.uuid4()}")
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     log_date = db.Column(db.Date, nullable=False)
     food_item = db.Column(db.String(200), nullable=False)
     macros = db.Column(db.Text, default='{}')
+    food_id = db.Column(db.String, db.ForeignKey('food.id'), index=True)
     client = db.relationship('Client', backref=db.backref('nutrition_logs', lazy=True))
 
+class NutritionGoal(db.Model):
+    """A client's nutrition targets: stored values ('manual') or computed from their profile ('auto')."""
+    client_id = db.Column(db.String, db.ForeignKey('client.id'), primary_key=True)
+    mode = db.Column(db.String(10), nullable=False, default='manual')
+    goal_type = db.Column(db.String(10), default='maintain')  # lose / maintain / gain, for auto mode
+    calories = db.Column(db.Float)
+    protein = db.Column(db.Float)
+    carbs = db.Column(db.Float)
+    fat = db.Column(db.Float)
+    fiber = db.Column(db.Float)
+    water = db.Column(db.Float)  # glasses
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Food(db.Model):
+    """Food reference data; nutrient columns are per 100 g."""
+    id = db.Column(db.String, primary_key=True, default=lambda: f"food_{uuid.uuid4()}")
+    external_id = db.Column(db.String(100), unique=True)  # ID in the source dataset, for re-imports
+    name = db.Column(db.String(200), nullable=False)
+    brand = db.Column(db.String(200))
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    fiber = db.Column(db.Float, nullable=False, default=0)
+    sugar = db.Column(db.Float, nullable=False, default=0)
+    sodium = db.Column(db.Float, nullable=False, default=0)  # mg
+    serving_size_g = db.Column(db.Float)  # Typical serving, if the dataset provides one
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'external_id': self.external_id,
+            'name': self.name,
+            'brand': self.brand,
+            'per_100g': {
+                'calories': self.calories,
+                'protein': self.protein,
+                'carbs': self.carbs,
+                'fat': self.fat,
+                'fiber': self.fiber,
+                'sugar': self.sugar,
+                'sodium': self.sodium,
+            },
+            'serving_size_g': self.serving_size_g,
+        }
+
+class CatalogVersion(db.Model):
+    """Change counter per reference catalog, shared by every worker so derived indexes rebuild everywhere."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class NutritionDailyTotal(db.Model):
+    """Per-client, per-day macro sums maintained alongside NutritionLog writes."""
+    client_id = db.Column(db.String, db.ForeignKey('client.id'), primary_key=True)
+    log_date = db.Column(db.Date, primary_key=True)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    fiber = db.Column(db.Float, nullable=False, default=0)
+    sugar = db.Column(db.Float, nullable=False, default=0)
+    sodium = db.Column(db.Float, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'date': self.log_date.isoformat(),
+            'calories': self.calories,
+            'protein': self.protein,
+            'carbs': self.carbs,
+            'fat': self.fat,
+            'fiber': self.fiber,
+            'sugar': self.sugar,
+            'sodium': self.sodium,
+            'entries': self.entry_count,
+        }
+
 class License(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
@@ -173,6 +316,38 @@ class Resource(db.Model):
     title = db.Column(db.String(100), nullable=False)
     filename = db.Column(db.String(200), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # File contents in blob storage
+    blob_key = db.Column(db.String(200))
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger)
+    sha256 = db.Column(db.String(64))
+
+class ResourceUpload(db.Model):
+    """A resumable upload in progress; chunks are stored as blobs until the upload is completed."""
+    id = db.Column(db.String, primary_key=True, default=lambda: f"rup_{uuid.uuid4()}")
+    title = db.Column(db.String(100), nullable=False)
+    filename = db.Column(db.String(200), nullable=False)
+    content_type = db.Column(db.String(100))
+    total_size = db.Column(db.BigInteger)  # Declared by the client, if known
+    sha256 = db.Column(db.String(64))  # Expected checksum, if declared up front
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    parts = db.Column(db.Text, nullable=False, default='[]')  # JSON list of [offset, size, blob key]
+    resource_id = db.Column(db.String, db.ForeignKey('resource.id'))  # Set once completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'offset': self.received,
+            'completed': self.resource_id is not None,
+            'resource_id': self.resource_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
 
 class Message(db.Model):
     id = db.Column(db.String, primary_key=True, default=lambda: f"msg_{uuid.uuid4()}")
@@ -193,6 +368,7 @@ class Achievement(db.Model):
     client = db.relationship('Client', backref=db.backref('achievements', lazy=True))
 
 class BodyStat(db.Model):
+    __table_args__ = (db.Index('ix_body_stat_client_date', 'client_id', 'date'),)
     id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -204,7 +380,11 @@ class ProgressPhoto(db.Model):
     id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id = db.Column(db.String, db.ForeignKey('client.id'), nullable=False)
     filename = db.Column(db.String(200), nullable=False)
+    # Original in blob storage (private key); unset for photos saved under uploads/
+    blob_key = db.Column(db.String(200), index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    variants = db.Column(db.Text, default='{}')  # JSON of variant name -> blob key
+    processing_status = db.Column(db.String(20), default='pending')  # pending, processing, ready or failed
     client = db.relationship('Client', backref=db.backref('progress_photos', lazy=True))
 
 class DailyCheckin(db.Model):
@@ -214,11 +394,19 @@ class DailyCheckin(db.Model):
     metrics = db.Column(db.Text, default='{}')
     client = db.relationship('Client', backref=db.backref('daily_checkins', lazy=True))
 
+group_membership = db.Table('group_membership',
+    db.Column('group_id', db.String, db.ForeignKey('group.id'), primary_key=True),
+    db.Column('client_id', db.String, db.ForeignKey('client.id'), primary_key=True),
+    # The primary key covers group -> clients; this covers client -> groups
+    db.Index('ix_group_membership_client_id', 'client_id')
+)
+
 class Group(db.Model):
     id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
-    client_ids = db.Column(db.Text, default='[]')
+    clients = db.relationship('Client', secondary=group_membership, lazy=True,
+                              backref=db.backref('groups', lazy=True))
 
 class Alert(db.Model):
     id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
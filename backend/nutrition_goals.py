@@ -0,0 +1,105 @@
+from .models import NutritionGoal, NutritionDailyTotal
+from .nutrition_rollups import ROLLUP_FIELDS
+
+GOAL_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'water')
+GOAL_TYPES = ('lose', 'maintain', 'gain')
+
+# Used when a client has no stored goals
+DEFAULT_GOALS = {
+    'calories': 2000,
+    'protein': 150,
+    'carbs': 200,
+    'fat': 65,
+    'fiber': 25,
+    'water': 8  # glasses
+}
+
+# Daily calorie adjustment applied to TDEE per goal type
+GOAL_CALORIE_ADJUSTMENT = {'lose': -500, 'maintain': 0, 'gain': 300}
+PROTEIN_G_PER_KG = {'lose': 2.0, 'maintain': 1.8, 'gain': 1.8}
+FAT_SHARE_OF_CALORIES = 0.25
+FIBER_G_PER_1000_KCAL = 14
+
+
+def activity_factor(workout_frequency):
+    """Standard TDEE multipliers keyed off weekly training sessions."""
+    sessions = workout_frequency or 0
+    if sessions <= 0:
+        return 1.2
+    if sessions <= 2:
+        return 1.375
+    if sessions <= 5:
+        return 1.55
+    if sessions <= 7:
+        return 1.725
+    return 1.9
+
+
+def mifflin_st_jeor(weight_kg, height_cm, age, gender):
+    """Basal metabolic rate in kcal/day; the sex term is averaged when gender isn't male/female."""
+    base = 10 * weight_kg + 6.25 * height_cm - 5 * age
+    gender = (gender or '').strip().lower()
+    if gender in ('male', 'm', 'man'):
+        return base + 5
+    if gender in ('female', 'f', 'woman'):
+        return base - 161
+    return base - 78
+
+
+def missing_profile_fields(client):
+    return [field for field in ('weight', 'height', 'age') if not getattr(client, field)]
+
+
+def compute_auto_targets(client, goal_type='maintain'):
+    """Targets from the client's profile, or None when weight, height or age is missing."""
+    if missing_profile_fields(client):
+        return None
+    goal_type = goal_type if goal_type in GOAL_TYPES else 'maintain'
+    bmr = mifflin_st_jeor(client.weight, client.height, client.age, client.gender)
+    calories = bmr * activity_factor(client.workout_frequency) + GOAL_CALORIE_ADJUSTMENT[goal_type]
+    protein = PROTEIN_G_PER_KG[goal_type] * client.weight
+    fat = calories * FAT_SHARE_OF_CALORIES / 9
+    carbs = max(calories - protein * 4 - fat * 9, 0) / 4
+    return {
+        'calories': round(calories),
+        'protein': round(protein),
+        'carbs': round(carbs),
+        'fat': round(fat),
+        'fiber': round(calories / 1000 * FIBER_G_PER_1000_KCAL),
+        'water': DEFAULT_GOALS['water'],
+    }
+
+
+def resolve_goals(client):
+    """The client's effective targets plus how they were derived."""
+    goal = NutritionGoal.query.get(client.id)
+    if not goal:
+        return {**DEFAULT_GOALS, 'mode': 'default'}
+    if goal.mode == 'auto':
+        computed = compute_auto_targets(client, goal.goal_type)
+        if computed:
+            return {**computed, 'mode': 'auto', 'goal_type': goal.goal_type}
+        # Profile data was removed since auto mode was chosen; fall back to stored/default values
+    stored = {field: getattr(goal, field) for field in GOAL_FIELDS}
+    return {**DEFAULT_GOALS, **{k: v for k, v in stored.items() if v is not None},
+            'mode': goal.mode, 'goal_type': goal.goal_type}
+
+
+def goal_comparison(client, day):
+    """
+    Targets vs the day's rollup totals. Not cached: it is two primary-key reads,
+    and a per-process cache would serve other workers' stale numbers.
+    """
+    goals = resolve_goals(client)
+    total = NutritionDailyTotal.query.get((client.id, day))
+    actual = {field: round(getattr(total, field), 1) if total else 0.0 for field in ROLLUP_FIELDS}
+    comparison = {
+        'date': day.isoformat(),
+        'goals': goals,
+        'actual': actual,
+        'entries': total.entry_count if total else 0,
+        'remaining': {f: round(goals[f] - actual[f], 1) for f in GOAL_FIELDS if f in actual},
+        'percent': {f: round(actual[f] / goals[f] * 100, 1) if goals[f] else None
+                    for f in GOAL_FIELDS if f in actual},
+    }
+    return comparison
@@ -0,0 +1,155 @@
+"""
+Imports nutrition diary exports (MyFitnessPal, Cronometer and similar) from CSV.
+
+Rows are parsed as they stream in and inserted with bulk statements in
+batches. Macro totals are accumulated per date in memory, so each affected
+daily rollup is updated once at the end. Logs and rollups are committed
+together: an import either lands completely or not at all, apart from rows
+rejected during validation.
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+from .models import db, NutritionLog
+from .nutrition_rollups import ROLLUP_FIELDS, apply_rollup_delta
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%Y/%m/%d')
+
+# Header names recognised when no explicit mapping is given for a field
+COLUMN_ALIASES = {
+    'date': ('date', 'day', 'log_date'),
+    'food_item': ('food_item', 'food', 'food name', 'name', 'description', 'item'),
+    'meal_type': ('meal_type', 'meal', 'meal name', 'group'),
+    'serving_size': ('serving_size', 'serving', 'serving size', 'amount', 'quantity'),
+    'calories': ('calories', 'energy (kcal)', 'kcal', 'energy'),
+    'protein': ('protein', 'protein (g)'),
+    'carbs': ('carbs', 'carbohydrates', 'carbohydrates (g)', 'carbs (g)'),
+    'fat': ('fat', 'fat (g)', 'total fat'),
+    'fiber': ('fiber', 'fibre', 'fiber (g)'),
+    'sugar': ('sugar', 'sugars', 'sugar (g)'),
+    'sodium': ('sodium', 'sodium (mg)'),
+}
+
+
+def resolve_column_mapping(header, mapping=None):
+    """
+    {field: source column} for the file's header. Explicit `mapping` entries
+    win; other fields are matched case-insensitively against COLUMN_ALIASES.
+    """
+    mapping = dict(mapping or {})
+    by_lower = {h.strip().lower(): h for h in header if h}
+    resolved = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if mapping.get(field):
+            resolved[field] = mapping[field]
+            continue
+        for alias in aliases:
+            if alias in by_lower:
+                resolved[field] = by_lower[alias]
+                break
+    return resolved
+
+
+def _parse_date(value, date_format=None):
+    value = (value or '').strip()
+    for fmt in ((date_format,) if date_format else DATE_FORMATS):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date: {value!r}")
+
+
+def _parse_amount(value, field):
+    value = (value or '').strip().replace(',', '')
+    if not value:
+        return 0.0
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"invalid {field}: {value!r}")
+    if number < 0:
+        raise ValueError(f"negative {field}")
+    return number
+
+
+def parse_diary_row(row, columns, date_format=None):
+    """Validates one CSV row into NutritionLog column values. Raises ValueError."""
+    def value(field):
+        column = columns.get(field)
+        return row.get(column) if column else None
+
+    food_item = (value('food_item') or '').strip()
+    if not food_item:
+        raise ValueError("missing food item")
+    macros = {field: _parse_amount(value(field), field) for field in ROLLUP_FIELDS}
+    macros['serving_size'] = (value('serving_size') or '').strip()
+    macros['meal_type'] = (value('meal_type') or '').strip().lower() or 'other'
+    return {
+        'log_date': _parse_date(value('date'), date_format),
+        'food_item': food_item[:200],
+        'macros': macros,
+    }
+
+
+def import_diary_csv(client_id, stream, mapping=None, date_format=None,
+                     batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Imports a CSV diary from a binary file object for one client. `progress`
+    is called with the running summary after each batch. Returns (summary,
+    affected dates). Caller commits.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    columns = resolve_column_mapping(reader.fieldnames or [], mapping)
+    missing = [field for field in ('date', 'food_item') if field not in columns]
+    if missing:
+        raise ValueError(f"No column found for: {', '.join(missing)}")
+
+    summary = {'rows': 0, 'imported': 0, 'error_count': 0, 'errors': [], 'dates': 0}
+    day_totals = {}
+    batch = []
+
+    def flush():
+        db.session.execute(db.insert(NutritionLog), batch)
+        summary['imported'] += len(batch)
+        batch.clear()
+        if progress:
+            progress(summary)
+
+    # Data starts on line 2, after the header
+    for line_number, row in enumerate(reader, start=2):
+        summary['rows'] += 1
+        try:
+            parsed = parse_diary_row(row, columns, date_format)
+        except ValueError as e:
+            summary['error_count'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+
+        totals = day_totals.setdefault(parsed['log_date'], {'entries': 0, **{f: 0.0 for f in ROLLUP_FIELDS}})
+        totals['entries'] += 1
+        for field in ROLLUP_FIELDS:
+            totals[field] += parsed['macros'][field]
+        batch.append({
+            'id': f"nl_{uuid.uuid4()}",
+            'client_id': client_id,
+            'log_date': parsed['log_date'],
+            'food_item': parsed['food_item'],
+            'macros': json.dumps(parsed['macros']),
+        })
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    for log_date, totals in day_totals.items():
+        entries = totals.pop('entries')
+        apply_rollup_delta(client_id, log_date, totals, entries=entries)
+    summary['dates'] = len(day_totals)
+    return summary, sorted(day_totals)
@@ -0,0 +1,87 @@
+import json
+from datetime import timedelta
+
+from .models import db, NutritionDailyTotal
+
+ROLLUP_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+
+
+def macro_values(macros):
+    """Rollup fields of a NutritionLog.macros blob (JSON string or dict) as floats."""
+    if isinstance(macros, str):
+        try:
+            macros = json.loads(macros or '{}')
+        except json.JSONDecodeError:
+            macros = {}
+    if not isinstance(macros, dict):
+        macros = {}
+    values = {}
+    for field in ROLLUP_FIELDS:
+        try:
+            values[field] = float(macros.get(field) or 0)
+        except (TypeError, ValueError):
+            values[field] = 0.0
+    return values
+
+
+def apply_rollup_delta(client_id, log_date, delta, entries=0):
+    """
+    Adds `delta` ({field: amount}) and `entries` to a day's totals with an
+    in-database increment, creating the row on first use. Rows whose last entry
+    is removed are deleted so float drift can't accumulate. Caller commits.
+    """
+    increments = {getattr(NutritionDailyTotal, f): getattr(NutritionDailyTotal, f) + delta.get(f, 0.0)
+                  for f in ROLLUP_FIELDS}
+    increments[NutritionDailyTotal.entry_count] = NutritionDailyTotal.entry_count + entries
+    updated = NutritionDailyTotal.query \
+        .filter_by(client_id=client_id, log_date=log_date) \
+        .update(increments, synchronize_session=False)
+    if not updated:
+        db.session.add(NutritionDailyTotal(client_id=client_id, log_date=log_date, entry_count=entries,
+                                           **{f: delta.get(f, 0.0) for f in ROLLUP_FIELDS}))
+        db.session.flush()
+    elif entries < 0:
+        NutritionDailyTotal.query \
+            .filter(NutritionDailyTotal.client_id == client_id,
+                    NutritionDailyTotal.log_date == log_date,
+                    NutritionDailyTotal.entry_count <= 0) \
+            .delete(synchronize_session=False)
+
+
+def record_log_added(log):
+    apply_rollup_delta(log.client_id, log.log_date, macro_values(log.macros), entries=1)
+
+
+def record_log_removed(log):
+    values = macro_values(log.macros)
+    apply_rollup_delta(log.client_id, log.log_date, {f: -v for f, v in values.items()}, entries=-1)
+
+
+def record_log_changed(log, old_macros):
+    old_values, new_values = macro_values(old_macros), macro_values(log.macros)
+    apply_rollup_delta(log.client_id, log.log_date, {f: new_values[f] - old_values[f] for f in ROLLUP_FIELDS})
+
+
+def daily_totals(client_id, start, end):
+    """Stored day rows in [start, end], ordered by date (days without logs are absent)."""
+    return NutritionDailyTotal.query \
+        .filter(NutritionDailyTotal.client_id == client_id,
+                NutritionDailyTotal.log_date >= start,
+                NutritionDailyTotal.log_date <= end) \
+        .order_by(NutritionDailyTotal.log_date) \
+        .all()
+
+
+def weekly_totals(rows):
+    """Folds day rows into Monday-based weeks with sums and per-logged-day averages."""
+    weeks = {}
+    for row in rows:
+        week_start = row.log_date - timedelta(days=row.log_date.weekday())
+        week = weeks.setdefault(week_start, {'week_start': week_start.isoformat(), 'days_logged': 0,
+                                             **{f: 0.0 for f in ROLLUP_FIELDS}})
+        week['days_logged'] += 1
+        for field in ROLLUP_FIELDS:
+            week[field] += getattr(row, field)
+    for week in weeks.values():
+        week['daily_average'] = {f: round(week[f] / week['days_logged'], 1) for f in ROLLUP_FIELDS}
+    return [weeks[k] for k in sorted(weeks)]
@@ -0,0 +1,98 @@
+import hashlib
+import json
+
+from sqlalchemy import update
+
+from .models import db, ProgramAssignment, ClientExerciseCustomization
+from .template_versions import get_assignment_days
+
+
+def _load_json(raw, default):
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return default
+
+
+def compile_effective_program(assignment, template):
+    """
+    Merges a template with an assignment's enabled days, day-level overrides and
+    exercise customisations into the workout structure served to the client app.
+    """
+    days_data = get_assignment_days(assignment, template)
+    enabled_days = _load_json(assignment.enabled_days, []) or list(range(len(days_data)))
+    day_customizations = _load_json(assignment.day_customizations, {})
+
+    filtered_days = []
+    for i, day in enumerate(days_data):
+        if i not in enabled_days:
+            continue
+        # Cached days are shared read-only views; only copy the ones we customise
+        customized_day = day
+        day_custom = day_customizations.get(str(i))
+        if day_custom and isinstance(day, dict):
+            customized_day = dict(day)
+            if 'name' in day_custom:
+                customized_day['name'] = day_custom['name']
+            if 'description' in day_custom:
+                customized_day['description'] = day_custom['description']
+        filtered_days.append(customized_day)
+
+    # One query for every customisation instead of lazy-loading the relationship
+    exercise_customizations = {}
+    for custom in ClientExerciseCustomization.query.filter_by(assignment_id=assignment.id).all():
+        exercise_customizations[f"{custom.day_index}_{custom.exercise_id}"] = custom.to_dict()
+
+    return {
+        "id": template.id,
+        "templateId": template.id,
+        "templateName": assignment.custom_name or (
+            assignment.template_version.name if assignment.template_version else template.name),
+        "days": filtered_days,
+        "exerciseCustomizations": exercise_customizations,
+    }
+
+
+def get_compiled_program(assignment, template):
+    """
+    Returns (workout_json, etag) for an assignment, compiling and storing the
+    artifact on first use or after it has been invalidated. The artifact is
+    written in its own short transaction, leaving the caller's session alone,
+    and only if no invalidation happened since the assignment was read.
+    """
+    if assignment.compiled_program and assignment.compiled_etag:
+        return assignment.compiled_program, assignment.compiled_etag
+
+    workout = compile_effective_program(assignment, template)
+    compiled = json.dumps(workout, separators=(',', ':'), sort_keys=True)
+    etag = hashlib.sha256(compiled.encode('utf-8')).hexdigest()[:32]
+
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(ProgramAssignment.__table__)
+            .where(ProgramAssignment.__table__.c.id == assignment.id,
+                   ProgramAssignment.__table__.c.compiled_version == assignment.compiled_version)
+            .values(compiled_program=compiled, compiled_etag=etag)
+        )
+    return compiled, etag
+
+
+def invalidate_compiled_programs(assignment_id=None, template_id=None, unpinned_only=False):
+    """
+    Clears stored artifacts so the next read recompiles. With `unpinned_only`,
+    assignments pinned to a template version are left alone. Caller commits.
+    """
+    query = ProgramAssignment.query
+    if assignment_id is not None:
+        query = query.filter(ProgramAssignment.id == assignment_id)
+    if template_id is not None:
+        query = query.filter(ProgramAssignment.template_id == template_id)
+    if unpinned_only:
+        query = query.filter(ProgramAssignment.template_version_id.is_(None))
+    query.update({
+        ProgramAssignment.compiled_program: None,
+        ProgramAssignment.compiled_etag: None,
+        ProgramAssignment.compiled_version: ProgramAssignment.compiled_version + 1,
+    }, synchronize_session='fetch')
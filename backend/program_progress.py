@@ -0,0 +1,109 @@
+from sqlalchemy import func, update
+from sqlalchemy.orm import joinedload
+
+from .models import db, ProgramAssignment, WorkoutTemplate, WorkoutLog
+from .calendar_engine import build_assignment_calendar, get_assignment_calendar
+from .template_cache import get_template_days
+from .template_versions import get_versions_days
+
+
+def trainable_day_indexes(assignment, template):
+    """Enabled, non-rest day indexes in program order (shared with the cached calendar index)."""
+    return _session_day_indexes(get_assignment_calendar(assignment, template))
+
+
+def _session_day_indexes(calendar):
+    return [session['day_index'] for session in calendar.sessions]
+
+
+def next_day_index(trainable, completed_index):
+    """The first trainable day after `completed_index`, wrapping to the start of the cycle."""
+    if not trainable:
+        return 0
+    for index in trainable:
+        if index > completed_index:
+            return index
+    return trainable[0]
+
+
+def advance_day_pointer(assignment, template, completed_index):
+    """Moves the assignment's pointer past a completed day. Caller commits."""
+    if template is None:
+        return assignment.current_day_index
+    assignment.current_day_index = next_day_index(trainable_day_indexes(assignment, template), completed_index)
+    return assignment.current_day_index
+
+
+def _latest_completed_days():
+    """
+    ({assignment_id: day index of its most recently written log}, ids whose
+    latest log can't be told apart). Logs are ordered by created_at, as
+    log_workout advances from the day actually logged last. Assignments with
+    only older, unstamped logs fall back to their latest date, and are
+    ambiguous when that date has more than one log.
+    """
+    latest_stamps = db.session.query(
+        WorkoutLog.assignment_id,
+        func.max(WorkoutLog.created_at).label('latest_at'),
+    ).filter(WorkoutLog.created_at.isnot(None)).group_by(WorkoutLog.assignment_id).subquery()
+    latest = dict(db.session.query(WorkoutLog.assignment_id, WorkoutLog.day_index_completed)
+                  .join(latest_stamps, (WorkoutLog.assignment_id == latest_stamps.c.assignment_id) &
+                        (WorkoutLog.created_at == latest_stamps.c.latest_at))
+                  .all())
+
+    latest_dates = db.session.query(
+        WorkoutLog.assignment_id,
+        func.max(WorkoutLog.actual_date).label('latest_date'),
+    ).group_by(WorkoutLog.assignment_id).subquery()
+    rows = db.session.query(WorkoutLog.assignment_id, func.min(WorkoutLog.day_index_completed),
+                            func.count(WorkoutLog.id)) \
+        .join(latest_dates, (WorkoutLog.assignment_id == latest_dates.c.assignment_id) &
+              (WorkoutLog.actual_date == latest_dates.c.latest_date)) \
+        .group_by(WorkoutLog.assignment_id) \
+        .all()
+    ambiguous = set()
+    for assignment_id, day_index, log_count in rows:
+        if assignment_id in latest:
+            continue
+        if log_count == 1:
+            latest[assignment_id] = day_index
+        else:
+            ambiguous.add(assignment_id)
+    return latest, ambiguous
+
+
+def repair_day_pointers():
+    """
+    Recomputes every assignment's current_day_index from its WorkoutLog history
+    and writes back only the rows that drifted, in one bulk update.
+    """
+    latest, ambiguous = _latest_completed_days()
+    assignments = ProgramAssignment.query.options(joinedload(ProgramAssignment.template_version)).all()
+    templates = {t.id: t for t in WorkoutTemplate.query.filter(
+        WorkoutTemplate.id.in_({a.template_id for a in assignments})).all()} if assignments else {}
+    version_days = get_versions_days({a.template_version for a in assignments if a.template_version})
+
+    changes = []
+    for assignment in assignments:
+        template = templates.get(assignment.template_id)
+        # Several unordered logs on the latest day: leave the pointer log_workout set
+        if template is None or assignment.id in ambiguous:
+            continue
+        # Built directly rather than through the calendar cache: a sweep over every
+        # assignment would only evict the calendars live requests are using
+        if assignment.template_version_id and assignment.template_version:
+            days = version_days[assignment.template_version_id]
+        else:
+            days = get_template_days(template)
+        trainable = _session_day_indexes(build_assignment_calendar(assignment, template, days))
+        if assignment.id in latest:
+            expected = next_day_index(trainable, latest[assignment.id])
+        else:
+            expected = trainable[0] if trainable else 0
+        if assignment.current_day_index != expected:
+            changes.append({'id': assignment.id, 'current_day_index': expected})
+
+    if changes:
+        db.session.execute(update(ProgramAssignment), changes)
+    db.session.commit()
+    return {'checked': len(assignments), 'repaired': len(changes), 'skipped': len(ambiguous)}
@@ -0,0 +1,169 @@
+"""
+Background variant generation for progress photos.
+
+Uploads are streamed into blob storage and answered immediately; thumbnail,
+medium and full-size variants, re-encoded without EXIF, are rendered in a
+small process pool so resizing multi-megapixel phone photos never holds up a
+request or the event loop. Workers read the original from and write the variants to blob storage
+themselves, so only keys cross the process boundary. Originals keep their
+EXIF (GPS, device), so they are stored under a private explicit key that
+/blobs never serves; only the variants are content-addressed. When a photo's variants
+are stored the result is queued for a background task on the server's event
+loop, which updates the row and emits 'progress_photo_ready' to the client's
+room.
+"""
+import json
+import pathlib
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .app import socketio
+from .blob_storage import get_blob_storage, blob_url
+from .media_service import UPLOADS_ROOT, PHOTO_VARIANTS, render_photo_variants
+from .models import db, ProgressPhoto
+
+PHOTO_WORKERS = 2
+
+STATUS_PENDING = 'pending'
+# Queued or rendering; not picked up again by enqueue_pending_photos
+STATUS_PROCESSING = 'processing'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+
+RESULT_POLL_INTERVAL = 0.5
+
+_pool = None
+_pool_lock = threading.Lock()
+# Finished jobs as (photo id, result), consumed on the server's event loop
+_results = queue.Queue()
+_drainer_started = False
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS)
+        return _pool
+
+
+def original_key(photo_id, filename):
+    """Private storage key for a photo's unprocessed original."""
+    return f"photos/originals/{photo_id}{pathlib.PurePosixPath(filename).suffix.lower()}"
+
+
+def process_photo(blob_key, legacy_filename=None):
+    """
+    Renders and stores the variants of one photo. Runs in a worker process, so
+    it only takes and returns plain data. Photos uploaded before blob storage
+    are read from the uploads directory by `legacy_filename`.
+    """
+    result = {'variants': {}, 'error': None}
+    try:
+        storage = get_blob_storage()
+        source = storage.open(blob_key) if blob_key else open(UPLOADS_ROOT / legacy_filename, 'rb')
+        with source:
+            rendered = render_photo_variants(source)
+        for variant, data in rendered.items():
+            extension = PHOTO_VARIANTS[variant][0]
+            result['variants'][variant] = storage.put_bytes(data, filename=f"{variant}{extension}").key
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _future_result(future):
+    try:
+        return future.result()
+    except Exception as e:
+        return {'variants': {}, 'error': str(e)}
+
+
+def _record_result(app, photo_id, result):
+    with app.app_context():
+        photo = db.session.get(ProgressPhoto, photo_id)
+        if not photo:
+            return
+        if result['error']:
+            app.logger.error(f"Error generating variants for progress photo {photo_id}: {result['error']}")
+            photo.processing_status = STATUS_FAILED
+        else:
+            photo.variants = json.dumps(result['variants'])
+            photo.processing_status = STATUS_READY
+        db.session.commit()
+        socketio.emit('progress_photo_ready', progress_photo_to_dict(photo), room=f"client_{photo.client_id}")
+
+
+def _drain_results(app):
+    """Background task on the server's event loop: records finished jobs and notifies clients."""
+    while True:
+        try:
+            photo_id, result = _results.get_nowait()
+        except queue.Empty:
+            socketio.sleep(RESULT_POLL_INTERVAL)
+            continue
+        try:
+            _record_result(app, photo_id, result)
+        except Exception as e:
+            app.logger.error(f"Error recording variants for progress photo {photo_id}: {e}")
+
+
+def _ensure_drainer(app):
+    global _drainer_started
+    with _pool_lock:
+        if _drainer_started:
+            return
+        _drainer_started = True
+    socketio.start_background_task(_drain_results, app)
+
+
+def enqueue_photo_variants(app, photo):
+    """
+    Schedules variant generation for a saved photo, which should already be
+    committed as processing. `app` is the real Flask app, not the proxy.
+    """
+    _ensure_drainer(app)
+    legacy_filename = None if photo.blob_key else photo.filename
+    future = _get_pool().submit(process_photo, photo.blob_key, legacy_filename)
+    # Runs on the executor's management thread: only hand the result over, never touch the DB or sockets here
+    future.add_done_callback(lambda f, photo_id=photo.id: _results.put((photo_id, _future_result(f))))
+    return future
+
+
+def enqueue_pending_photos(app, include_processing=False):
+    """
+    Queues photos still pending (uploaded before variants existed) and marks
+    them processing, so a second call doesn't queue them again. With
+    `include_processing`, photos left processing by a stopped server are
+    queued too. Commits, then returns the count.
+    """
+    statuses = (STATUS_PENDING, STATUS_PROCESSING) if include_processing else (STATUS_PENDING,)
+    photos = ProgressPhoto.query.filter(ProgressPhoto.processing_status.in_(statuses)).all()
+    for photo in photos:
+        photo.processing_status = STATUS_PROCESSING
+    db.session.commit()
+    for photo in photos:
+        enqueue_photo_variants(app, photo)
+    return len(photos)
+
+
+def progress_photo_to_dict(photo):
+    # Uploaded originals keep their EXIF (GPS, device), so only the re-encoded variants are linked;
+    # until they exist the URLs are null and clients show a placeholder
+    try:
+        variants = json.loads(photo.variants or '{}')
+    except json.JSONDecodeError:
+        variants = {}
+    variant_urls = {name: blob_url(key) for name, key in variants.items()}
+    return {
+        'id': photo.id,
+        'client_id': photo.client_id,
+        'filename': photo.filename,
+        'timestamp': photo.timestamp.isoformat() if photo.timestamp else None,
+        'status': photo.processing_status,
+        'url': variant_urls.get('full'),
+        'variants': variant_urls,
+        'thumbnail_url': variant_urls.get('thumb'),
+        'medium_url': variant_urls.get('medium'),
+    }
@@ -0,0 +1,226 @@
+"""
+Suggests next-session load and reps for a day's exercises from the client's
+recent working sets.
+
+History is read with one query and flattened into parallel numpy arrays (one
+entry per set), so every exercise is evaluated in the same vectorized pass.
+Each rule is computed for all exercises and the configured one is selected
+per exercise:
+
+- double_progression: add `increment` once every set of the last session hit
+  the top of the rep range, otherwise aim for one more rep at the same load.
+- rpe: load for the target reps at the target RPE, from the last session's
+  estimated 1RM.
+- percent_e1rm: a fixed share of the best estimated 1RM in the lookback.
+
+Estimated 1RM is Epley's formula with reps in reserve (10 - RPE) added to the
+reps performed when an RPE was recorded.
+"""
+import json
+import re
+
+import numpy as np
+
+from .models import db, WorkoutLog
+
+RULE_DOUBLE_PROGRESSION = 'double_progression'
+RULE_RPE = 'rpe'
+RULE_PERCENT_E1RM = 'percent_e1rm'
+PROGRESSION_RULES = (RULE_DOUBLE_PROGRESSION, RULE_RPE, RULE_PERCENT_E1RM)
+
+DEFAULT_SETTINGS = {
+    'rule': RULE_DOUBLE_PROGRESSION,
+    'increment': 2.5,       # load step, also the rounding unit
+    'target_rpe': 8.0,
+    'percent': 0.75,        # share of e1RM used by percent_e1rm
+    'lookback_logs': 30,
+}
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def _number(value):
+    """Parses numbers out of template/log strings such as '80kg' or '3min'."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        return float(match.group()) if match else None
+    return None
+
+
+def _rep_range(value):
+    """'8-10' -> (8.0, 10.0); '12' -> (12.0, 12.0); None when unparseable."""
+    if isinstance(value, str):
+        numbers = [float(n) for n in _NUMBER.findall(value)]
+        if numbers:
+            return min(numbers), max(numbers)
+        return None
+    number = _number(value)
+    return (number, number) if number is not None else None
+
+
+def exercise_targets(exercise):
+    """Prescription for a template exercise, whose sets are either a list of set dicts or a count."""
+    sets = exercise.get('sets')
+    # Cached template days are frozen, so lists arrive as tuples
+    if isinstance(sets, (list, tuple)):
+        set_dicts = [s for s in sets if isinstance(s, dict)]
+        set_count = len(set_dicts)
+    else:
+        set_dicts = [exercise]
+        set_count = int(_number(sets) or 0)
+
+    ranges = [r for r in (_rep_range(s.get('reps')) for s in set_dicts) if r]
+    rpes = [r for r in (_number(s.get('rpe')) for s in set_dicts) if r is not None]
+    weights = [w for w in (_number(s.get('weight')) for s in set_dicts) if w is not None]
+    percent = _number(exercise.get('percent'))
+    return {
+        'sets': set_count,
+        'rep_low': min(r[0] for r in ranges) if ranges else None,
+        'rep_high': max(r[1] for r in ranges) if ranges else None,
+        'rpe': max(rpes) if rpes else None,
+        'weight': max(weights) if weights else None,
+        'percent': percent / 100 if percent and percent > 1 else percent,
+        'rule': exercise.get('progression') if exercise.get('progression') in PROGRESSION_RULES else None,
+    }
+
+
+def _load_history(client_id, exercise_codes, lookback_logs):
+    """Working sets of the given exercises as arrays (exercise code, session rank, weight, reps, rpe)."""
+    rows = db.session.query(WorkoutLog.performance_data) \
+        .filter(WorkoutLog.client_id == client_id) \
+        .order_by(WorkoutLog.actual_date.desc()) \
+        .limit(lookback_logs) \
+        .all()
+
+    codes, sessions, weights, reps, rpes = [], [], [], [], []
+    for rank, (raw,) in enumerate(rows):
+        try:
+            performance = json.loads(raw or '{}').get('performanceLog') or {}
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        for exercise_id, sets in performance.items():
+            code = exercise_codes.get(exercise_id)
+            if code is None or not isinstance(sets, list):
+                continue
+            for s in sets:
+                if not isinstance(s, dict) or s.get('is_warmup') or s.get('completed') is False:
+                    continue
+                weight, rep_count = _number(s.get('weight')), _number(s.get('reps'))
+                if weight is None or not rep_count:
+                    continue
+                rpe = _number(s.get('rpe'))
+                codes.append(code)
+                sessions.append(rank)
+                weights.append(weight)
+                reps.append(rep_count)
+                rpes.append(rpe if rpe is not None and rpe <= 10 else np.nan)
+
+    return (np.array(codes, dtype=np.intp), np.array(sessions, dtype=np.intp),
+            np.array(weights, dtype=float), np.array(reps, dtype=float), np.array(rpes, dtype=float))
+
+
+def _epley(weight, reps, rpe):
+    reps_to_failure = reps + np.where(np.isnan(rpe), 0.0, 10.0 - rpe)
+    return weight * (1.0 + reps_to_failure / 30.0)
+
+
+def _load_for(e1rm, reps, rpe):
+    return e1rm / (1.0 + (reps + 10.0 - rpe) / 30.0)
+
+
+def _clean(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def suggest_progressions(client_id, exercises, settings=None):
+    """
+    Returns one suggestion dict per exercise dict in `exercises` (each needs an
+    'id'), in the same order. `settings` overrides DEFAULT_SETTINGS; a template
+    exercise can pick its own rule with a 'progression' key.
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    exercise_ids = [e.get('id') for e in exercises]
+    codes = {}
+    for exercise_id in exercise_ids:
+        codes.setdefault(exercise_id, len(codes))
+    n = len(codes)
+    if not n:
+        return []
+
+    targets = [exercise_targets(e) for e in exercises]
+    per_code = {}
+    for exercise_id, target in zip(exercise_ids, targets):
+        per_code.setdefault(codes[exercise_id], target)
+
+    def target_array(key, default=np.nan):
+        values = [per_code[c][key] for c in range(n)]
+        return np.array([default if v is None else v for v in values], dtype=float)
+
+    ex, session, weight, reps, rpe = _load_history(client_id, codes, settings['lookback_logs'])
+    e1rm = _epley(weight, reps, rpe)
+
+    # Per-exercise aggregates via unbuffered ufunc scatter
+    best_e1rm = np.full(n, np.nan)
+    np.fmax.at(best_e1rm, ex, e1rm)
+    latest = np.full(n, np.iinfo(np.intp).max)
+    np.minimum.at(latest, ex, session)
+    has_history = latest != np.iinfo(np.intp).max
+
+    in_last = session == latest[ex]
+    last_weight = np.full(n, np.nan)
+    np.fmax.at(last_weight, ex[in_last], weight[in_last])
+    last_e1rm = np.full(n, np.nan)
+    np.fmax.at(last_e1rm, ex[in_last], e1rm[in_last])
+    last_min_reps = np.full(n, np.nan)
+    np.fmin.at(last_min_reps, ex[in_last], reps[in_last])
+    top = in_last & (weight == last_weight[ex])
+    last_top_reps = np.full(n, np.nan)
+    np.fmin.at(last_top_reps, ex[top], reps[top])
+    last_rpe = np.full(n, np.nan)
+    np.fmax.at(last_rpe, ex[top], rpe[top])
+
+    increment = float(settings['increment'])
+    rep_low = np.where(np.isnan(target_array('rep_low')), last_top_reps, target_array('rep_low'))
+    rep_high = np.where(np.isnan(target_array('rep_high')), last_top_reps, target_array('rep_high'))
+    target_rpe = target_array('rpe', settings['target_rpe'])
+    percent = target_array('percent', settings['percent'])
+
+    # Double progression
+    hit_top = last_min_reps >= rep_high
+    dp_weight = np.where(hit_top, last_weight + increment, last_weight)
+    dp_reps = np.where(hit_top, rep_low, np.minimum(last_top_reps + 1, rep_high))
+    # RPE-based
+    rpe_weight = _load_for(last_e1rm, rep_low, target_rpe)
+    # Percentage of e1RM
+    pct_weight = percent * best_e1rm
+
+    rule_codes = np.array([PROGRESSION_RULES.index(per_code[c]['rule'] or settings['rule']) for c in range(n)])
+    suggested_weight = np.select([rule_codes == 0, rule_codes == 1], [dp_weight, rpe_weight], pct_weight)
+    suggested_reps = np.where(rule_codes == 0, dp_reps, rep_low)
+    suggested_weight = np.maximum(np.round(suggested_weight / increment) * increment, 0.0)
+
+    results = []
+    for exercise_id, target in zip(exercise_ids, targets):
+        c = codes[exercise_id]
+        if has_history[c]:
+            weight_out, reps_out = suggested_weight[c], suggested_reps[c]
+        else:
+            weight_out = np.nan if target['weight'] is None else target['weight']
+            reps_out = np.nan if target['rep_low'] is None else target['rep_low']
+        results.append({
+            'exercise_id': exercise_id,
+            'rule': PROGRESSION_RULES[rule_codes[c]],
+            'has_history': bool(has_history[c]),
+            'sets': target['sets'],
+            'suggested_weight': _clean(weight_out),
+            'suggested_reps': None if np.isnan(reps_out) else int(reps_out),
+            'last_weight': _clean(last_weight[c]),
+            'last_reps': None if np.isnan(last_top_reps[c]) else int(last_top_reps[c]),
+            'last_rpe': _clean(last_rpe[c], 1),
+            'e1rm': _clean(best_e1rm[c], 1),
+        })
+    return results
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+from .models import Food
+from .nutrition_rollups import ROLLUP_FIELDS
+from .template_cache import freeze
+
+MAX_CACHED_RECIPES = 1024
+MAX_CACHED_MACRO_RESULTS = 4096
+
+# Grams per unit; volumes assume water density
+UNIT_GRAMS = {
+    'g': 1, 'gram': 1, 'grams': 1,
+    'kg': 1000, 'mg': 0.001,
+    'oz': 28.3495, 'ounce': 28.3495, 'ounces': 28.3495,
+    'lb': 453.592, 'lbs': 453.592, 'pound': 453.592, 'pounds': 453.592,
+    'ml': 1, 'l': 1000,
+    'tsp': 5, 'teaspoon': 5, 'tbsp': 15, 'tablespoon': 15, 'cup': 240, 'cups': 240,
+}
+# Units meaning "one of the food's typical servings"
+SERVING_UNITS = {'', 'serving', 'servings', 'piece', 'pieces', 'each', 'unit', 'units', 'x'}
+
+_INGREDIENT_TEXT = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\.?\s+(.+?)\s*$')
+
+
+def _load_json(raw, default):
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return default
+
+
+class RecipeCache:
+    """
+    LRU of parsed recipe payloads keyed by recipe id. Each entry remembers the
+    raw column values it was parsed from, so an edited recipe is re-parsed on
+    its next read without explicit invalidation.
+    """
+
+    def __init__(self, max_recipes=MAX_CACHED_RECIPES):
+        self.max_recipes = max_recipes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(recipe):
+        return (recipe.name, recipe.ingredients, recipe.instructions, recipe.macros, recipe.servings)
+
+    def get(self, recipe):
+        stamp = self._stamp(recipe)
+        with self._lock:
+            entry = self._entries.get(recipe.id)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(recipe.id)
+                return entry[1]
+
+        payload = freeze({
+            'id': recipe.id,
+            'name': recipe.name,
+            'ingredients': _load_json(recipe.ingredients, []),
+            'instructions': recipe.instructions,
+            'macros': _load_json(recipe.macros, {}),
+            'servings': recipe.servings,
+        })
+        with self._lock:
+            self._entries[recipe.id] = (stamp, payload)
+            self._entries.move_to_end(recipe.id)
+            while len(self._entries) > self.max_recipes:
+                self._entries.popitem(last=False)
+        return payload
+
+    def invalidate(self, recipe_id):
+        with self._lock:
+            self._entries.pop(recipe_id, None)
+
+
+recipe_cache = RecipeCache()
+
+
+def get_recipe_payload(recipe):
+    """Parsed, read-only recipe details (ingredients and macros decoded)."""
+    return recipe_cache.get(recipe)
+
+
+def parse_ingredient(ingredient):
+    """
+    Normalises an ingredient to {'food_id', 'name', 'quantity', 'unit'}.
+    Accepts dicts (food_id/name, quantity/amount, unit) or text like '150 g oats'.
+    """
+    if isinstance(ingredient, str):
+        match = _INGREDIENT_TEXT.match(ingredient)
+        if not match:
+            return {'food_id': None, 'name': ingredient.strip(), 'quantity': 1.0, 'unit': ''}
+        quantity, unit, name = match.groups()
+        if unit.lower() not in UNIT_GRAMS and unit.lower() not in SERVING_UNITS:
+            # '2 eggs': the word after the number is part of the name
+            name, unit = f"{unit} {name}", ''
+        return {'food_id': None, 'name': name.strip(), 'quantity': float(quantity), 'unit': unit.lower()}
+    if not isinstance(ingredient, dict):
+        return None
+    try:
+        quantity = float(ingredient.get('quantity', ingredient.get('amount', 1)) or 0)
+    except (TypeError, ValueError):
+        quantity = 0.0
+    return {
+        'food_id': ingredient.get('food_id'),
+        'name': (ingredient.get('name') or ingredient.get('food') or '').strip(),
+        'quantity': quantity,
+        'unit': str(ingredient.get('unit') or '').strip().lower().rstrip('.'),
+    }
+
+
+def recipe_content_hash(recipe):
+    content = json.dumps([recipe.ingredients or '[]', recipe.servings or 1])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _ingredient_grams(ingredient, food):
+    unit = ingredient['unit']
+    if unit in UNIT_GRAMS:
+        return ingredient['quantity'] * UNIT_GRAMS[unit]
+    if unit in SERVING_UNITS and food.serving_size_g:
+        return ingredient['quantity'] * food.serving_size_g
+    return None
+
+
+def _load_foods(ingredient_lists):
+    """Foods referenced by id or exact (case-insensitive) name, fetched in at most two queries."""
+    ids, names = set(), set()
+    for ingredients in ingredient_lists:
+        for ingredient in ingredients:
+            if ingredient['food_id']:
+                ids.add(ingredient['food_id'])
+            elif ingredient['name']:
+                names.add(ingredient['name'].lower())
+    by_id = {f.id: f for f in Food.query.filter(Food.id.in_(ids)).all()} if ids else {}
+    by_name = {}
+    if names:
+        for food in Food.query.filter(func.lower(Food.name).in_(names)).order_by(Food.id).all():
+            by_name.setdefault(food.name.lower(), food)
+    return by_id, by_name
+
+
+class RecipeMacroEngine:
+    """
+    Computes recipe macros from ingredient quantities against the food table.
+    Results are per serving and cached by (recipe content hash, food catalog
+    version), so recipes sharing an ingredient list share one computation and
+    re-imported foods are picked up.
+    """
+
+    def __init__(self, max_results=MAX_CACHED_MACRO_RESULTS):
+        self.max_results = max_results
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def per_serving_many(self, recipes, catalog_version=0):
+        """{recipe_id: {'per_serving': {...}, 'unresolved': [...]}} for many recipes at once."""
+        results, pending = {}, {}
+        for recipe in recipes:
+            key = (recipe_content_hash(recipe), catalog_version)
+            cached = self._cached(key)
+            if cached is not None:
+                results[recipe.id] = cached
+            else:
+                pending.setdefault(key, []).append(recipe)
+        if not pending:
+            return results
+
+        parsed = {}
+        for key, same_content in pending.items():
+            raw = _load_json(same_content[0].ingredients, [])
+            parsed[key] = [i for i in map(parse_ingredient, raw if isinstance(raw, list) else []) if i]
+        by_id, by_name = _load_foods(parsed.values())
+
+        for key, ingredients in parsed.items():
+            totals = {field: 0.0 for field in ROLLUP_FIELDS}
+            unresolved = []
+            for ingredient in ingredients:
+                food = by_id.get(ingredient['food_id']) if ingredient['food_id'] else by_name.get(ingredient['name'].lower())
+                grams = _ingredient_grams(ingredient, food) if food else None
+                if grams is None:
+                    unresolved.append(ingredient['name'] or ingredient['food_id'])
+                    continue
+                for field in ROLLUP_FIELDS:
+                    totals[field] += getattr(food, field) * grams / 100.0
+            servings = pending[key][0].servings or 1
+            result = freeze({
+                'per_serving': {field: round(value / servings, 1) for field, value in totals.items()},
+                'unresolved': unresolved,
+            })
+            self._store(key, result)
+            for recipe in pending[key]:
+                results[recipe.id] = result
+        return results
+
+
+recipe_macro_engine = RecipeMacroEngine()
+
+
+def scale_macros(per_serving, servings):
+    return {field: round(value * servings, 1) for field, value in per_serving.items()}
+
+
+def recipe_payload_with_macros(recipe, result):
+    """
+    Recipe payload whose macros are the computed per-serving values from a
+    per_serving_many `result`. The hand-entered Recipe.macros are only served
+    when some ingredient doesn't resolve against the food table (or the recipe
+    lists none), since a partial sum would under-report the recipe.
+    """
+    payload = get_recipe_payload(recipe)
+    computed = bool(payload['ingredients']) and not result['unresolved']
+    if computed or not payload['macros']:
+        return {**payload, 'macros': result['per_serving'], 'macros_source': 'computed',
+                'unresolved': result['unresolved']}
+    return {**payload, 'macros_source': 'stored', 'unresolved': result['unresolved']}
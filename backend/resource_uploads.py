@@ -0,0 +1,206 @@
+"""
+Resumable uploads for trainer resources (PDF guides, videos).
+
+An upload is created first, then its bytes are appended in chunks, each sent
+with the offset it starts at. Every chunk is streamed straight into blob
+storage as its own part, so neither a chunk nor the file is ever held in
+memory. A chunk whose offset doesn't match what has been received is
+rejected with the current offset, letting the client resume after a dropped
+connection instead of starting again.
+
+Completing the upload first hashes the parts in order without writing
+anything; only when the SHA-256 matches are they joined into one
+content-addressed blob (copied server-side on S3) and the Resource created.
+Neither step holds the upload's row lock, which is only taken briefly to
+record the outcome. Completing twice returns the same resource. Parts are only removed from storage by
+`delete_parts` once the caller has committed, so a rolled-back request never
+leaves an upload pointing at deleted parts.
+"""
+import hashlib
+import json
+import uuid
+
+from .blob_storage import get_blob_storage, content_key, ConcatReader, CHUNK_SIZE
+from .models import db, Resource, ResourceUpload
+
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_RESOURCE_SIZE = 4 * 1024 * 1024 * 1024
+
+
+class OffsetMismatch(ValueError):
+    """A chunk did not start where the upload currently ends."""
+
+    def __init__(self, expected):
+        super().__init__(f"Upload is at offset {expected}")
+        self.expected = expected
+
+
+class ChecksumMismatch(ValueError):
+    """The assembled data didn't match the expected SHA-256; `parts` were dropped from the upload."""
+
+    def __init__(self, message, parts):
+        super().__init__(message)
+        self.parts = parts
+
+
+def _parts(upload):
+    return json.loads(upload.parts or '[]')
+
+
+def _part_key(upload, offset):
+    # Unique per attempt, so a retried chunk never overwrites one already recorded
+    return f"resource-uploads/{upload.id}/{offset:016d}-{uuid.uuid4().hex[:8]}"
+
+
+def delete_parts(parts):
+    """Removes parts returned by complete_upload or abort_upload; call after committing."""
+    storage = get_blob_storage()
+    for _, _, key in parts:
+        storage.delete(key)
+
+
+def create_upload(title, filename, total_size=None, sha256=None, content_type=None):
+    if total_size is not None and not 0 <= total_size <= MAX_RESOURCE_SIZE:
+        raise ValueError(f"size must be between 0 and {MAX_RESOURCE_SIZE} bytes")
+    upload = ResourceUpload(
+        title=title,
+        filename=filename,
+        total_size=total_size,
+        sha256=sha256.lower() if sha256 else None,
+        content_type=content_type,
+        received=0,
+        parts='[]',
+    )
+    db.session.add(upload)
+    return upload
+
+
+def append_chunk(upload_id, offset, stream, length):
+    """
+    Stores `length` bytes from `stream` at `offset` and returns the upload.
+    Raises OffsetMismatch, ValueError for invalid chunks and LookupError for
+    unknown or completed uploads. Caller commits.
+    """
+    if length is None or length <= 0:
+        raise ValueError("Chunk must have a Content-Length")
+    if length > MAX_CHUNK_SIZE:
+        raise ValueError(f"Chunks are limited to {MAX_CHUNK_SIZE} bytes")
+
+    upload = db.session.get(ResourceUpload, upload_id)
+    if not upload or upload.resource_id:
+        raise LookupError("Upload not found")
+    if offset != upload.received:
+        raise OffsetMismatch(upload.received)
+    limit = upload.total_size if upload.total_size is not None else MAX_RESOURCE_SIZE
+    if offset + length > limit:
+        raise ValueError("Chunk extends past the declared size")
+
+    # Stream the chunk to storage before taking the row lock
+    storage = get_blob_storage()
+    key = _part_key(upload, offset)
+    blob = storage.put(stream, key=key)
+    if blob.size != length:
+        storage.delete(key)
+        raise ValueError("Chunk was shorter than its Content-Length")
+
+    db.session.rollback()
+    upload = ResourceUpload.query.filter_by(id=upload_id).with_for_update().first()
+    if not upload or upload.resource_id or upload.received != offset:
+        # Another request appended (or completed) meanwhile
+        storage.delete(key)
+        if not upload or upload.resource_id:
+            raise LookupError("Upload not found")
+        raise OffsetMismatch(upload.received)
+    upload.parts = json.dumps(_parts(upload) + [[offset, blob.size, key]])
+    upload.received = offset + blob.size
+    return upload
+
+
+def _hash_parts(storage, parts):
+    sha = hashlib.sha256()
+    reader = ConcatReader(storage, [key for _, _, key in parts])
+    try:
+        for chunk in iter(lambda: reader.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    finally:
+        reader.close()
+    return sha.hexdigest()
+
+
+def _lock_unchanged(upload_id, parts):
+    """Re-reads the upload under its row lock, checking no chunk arrived since `parts` was read."""
+    db.session.rollback()
+    upload = ResourceUpload.query.filter_by(id=upload_id).with_for_update().first()
+    if not upload:
+        raise LookupError("Upload not found")
+    if not upload.resource_id and _parts(upload) != parts:
+        raise ValueError("Upload changed while completing; retry")
+    return upload
+
+
+def complete_upload(upload_id, sha256=None):
+    """
+    Verifies the parts against the SHA-256, joins them into the resource's
+    blob and creates the Resource. Returns (resource, parts to delete).
+    Raises LookupError, ValueError (incomplete or appended to meanwhile) or
+    ChecksumMismatch, which also resets the upload so the client restarts.
+    Caller commits, then deletes the parts.
+    """
+    upload = db.session.get(ResourceUpload, upload_id)
+    if not upload:
+        raise LookupError("Upload not found")
+    if upload.resource_id:
+        return db.session.get(Resource, upload.resource_id), []
+    if upload.total_size is not None and upload.received != upload.total_size:
+        raise ValueError(f"Upload is incomplete: {upload.received} of {upload.total_size} bytes received")
+    expected = (sha256 or upload.sha256 or '').lower() or None
+    if not expected:
+        raise ValueError("sha256 is required to complete an upload")
+
+    storage = get_blob_storage()
+    parts = _parts(upload)
+    filename, content_type = upload.filename, upload.content_type
+    # Hashed before anything is stored, so a mismatch leaves no blob behind
+    digest = _hash_parts(storage, parts)
+
+    if digest != expected:
+        upload = _lock_unchanged(upload_id, parts)
+        if upload.resource_id:
+            return db.session.get(Resource, upload.resource_id), []
+        upload.parts = '[]'
+        upload.received = 0
+        raise ChecksumMismatch(f"Checksum mismatch: received data hashes to {digest}", parts)
+
+    key = content_key(digest, filename)
+    if storage.exists(key):
+        blob = storage.stat(key)
+    else:
+        blob = storage.compose([k for _, _, k in parts], key, content_type=content_type, sha256=digest)
+
+    upload = _lock_unchanged(upload_id, parts)
+    if upload.resource_id:
+        # Completed by a concurrent request; the blob it stored is the same content
+        return db.session.get(Resource, upload.resource_id), []
+    resource = Resource(
+        title=upload.title,
+        filename=upload.filename,
+        blob_key=key,
+        content_type=content_type or blob.content_type,
+        size=blob.size,
+        sha256=digest,
+    )
+    db.session.add(resource)
+    db.session.flush()
+    upload.parts = '[]'
+    upload.resource_id = resource.id
+    return resource, parts
+
+
+def abort_upload(upload_id):
+    """Deletes an unfinished upload and returns its parts. Caller commits, then deletes the parts."""
+    upload = db.session.get(ResourceUpload, upload_id)
+    if not upload or upload.resource_id:
+        raise LookupError("Upload not found")
+    parts = _parts(upload)
+    db.session.delete(upload)
+    return parts
@@ -1,25 +1,53 @@
-from flask import current_app as app, jsonify, request, send_from_directory
+from flask import current_app as app, jsonify, redirect, request
 from functools import wraps
+import hashlib
 import json
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 import uuid
 import os
+import re
+from calendar import monthrange
 import urllib.parse
-import pathlib
 
-from sqlalchemy import or_
+from sqlalchemy import or_, update
+from sqlalchemy.orm import defer, joinedload
 from sqlalchemy.exc import IntegrityError
 
 from .achievements_service import check_for_new_pbs, add_achievements_to_client
 from .exercisedb_service import sync_exercises_from_exercisedb
+from .media_service import (UPLOADS_ROOT, EXERCISE_MEDIA_ROOT, queue_exercise_media_variants,
+                            exercise_media_variants_status, resolve_media_variant)
+from .media_delivery import send_media, ONE_YEAR
+from .substitution_service import get_similarity_index
+from .template_cache import get_template_days, template_cache, iter_day_exercises, parse_days, summarize_days
+from .program_compiler import get_compiled_program, invalidate_compiled_programs
+from .legacy_store import legacy_assignments, legacy_templates
+from .template_versions import ensure_current_version, snapshot_template, get_assignment_days, get_version_days
+from .calendar_engine import get_assignment_calendar, get_program_calendar, day_statuses, STATUS_CODES
+from .program_progress import advance_day_pointer, repair_day_pointers
+from .progression_service import suggest_progressions, PROGRESSION_RULES
+from .nutrition_rollups import record_log_added, record_log_changed, record_log_removed, daily_totals, weekly_totals
+from .food_service import import_foods, get_food_index, client_food_usage, food_macros
+from .nutrition_goals import GOAL_FIELDS, GOAL_TYPES, resolve_goals, missing_profile_fields, goal_comparison
+from .nutrition_import import import_diary_csv
+from .body_stats import body_stat_series, SERIES_FIELDS, DEFAULT_SERIES_POINTS, MAX_SERIES_POINTS
+from .body_stat_import import import_body_stats
+from .blob_storage import get_blob_storage, is_content_key, blob_url, BlobNotFound
+from .resource_uploads import (create_upload, append_chunk, complete_upload, abort_upload, OffsetMismatch,
+                               delete_parts, ChecksumMismatch, MAX_CHUNK_SIZE)
+from .progress_photos import (enqueue_photo_variants, enqueue_pending_photos, progress_photo_to_dict,
+                              original_key, STATUS_PROCESSING as PHOTO_STATUS_PROCESSING,
+                              STATUS_READY as PHOTO_STATUS_READY)
+from .recipe_service import recipe_macro_engine, recipe_payload_with_macros, scale_macros
 
 from .app import db, socketio, cache
 from flask_socketio import join_room, leave_room, emit
 from flask import request
 from .models import (Client, Exercise, WorkoutTemplate, ProgramAssignment, WorkoutLog,
                      Recipe, MealPlan, NutritionLog, BodyStat, ProgressPhoto, License,
-                     Prospect, Resource, Message, Achievement, DailyCheckin, Group, Alert, Program,
-                     Category, Muscle, Equipment, ClientExerciseCustomization)
+                     Prospect, Resource, ResourceUpload, Message, Achievement, DailyCheckin, Group, Alert, Program,
+                     Category, Muscle, Equipment, ClientExerciseCustomization, group_membership,
+                     WorkoutTemplateVersion, Food, NutritionGoal, CatalogVersion)
 
 
 # --- to_dict helpers ---
@@ -62,23 +90,24 @@ def program_to_dict(program):
         'weeks': json.loads(program.weeks) if program.weeks else []
     }
 
-def recipe_to_dict(recipe):
-    return {
-        'id': recipe.id,
-        'name': recipe.name,
-        'ingredients': json.loads(recipe.ingredients) if recipe.ingredients else [],
-        'instructions': recipe.instructions,
-        'macros': json.loads(recipe.macros) if recipe.macros else {}
-    }
+def recipe_to_dict(recipe, macro_result=None):
+    """Recipe details with computed macros; pass `macro_result` when it was batched with other recipes."""
+    if macro_result is None:
+        macro_result = recipe_macro_engine.per_serving_many([recipe], _food_catalog_version())[recipe.id]
+    return recipe_payload_with_macros(recipe, macro_result)
 
-def meal_plan_to_dict(meal_plan):
-    return {
+def meal_plan_to_dict(meal_plan, include_recipe=False, recipe_macros=None):
+    data = {
         'id': meal_plan.id,
         'client_id': meal_plan.client_id,
         'recipe_id': meal_plan.recipe_id,
         'assigned_date': meal_plan.assigned_date.isoformat() if meal_plan.assigned_date else None,
         'recipe_name': meal_plan.recipe.name if meal_plan.recipe else "Unknown Recipe"
     }
+    if include_recipe:
+        recipe = meal_plan.recipe
+        data['recipe'] = recipe_to_dict(recipe, (recipe_macros or {}).get(recipe.id)) if recipe else None
+    return data
 
 def nutrition_log_to_dict(log):
     macros_data = json.loads(log.macros) if log.macros else {}
@@ -87,6 +116,7 @@ def nutrition_log_to_dict(log):
         'client_id': log.client_id,
         'log_date': log.log_date.isoformat() if log.log_date else None,
         'food_item': log.food_item,
+        'food_id': log.food_id,
         'macros': macros_data,
         'calories': macros_data.get('calories', 0),
         'protein': macros_data.get('protein', 0),
@@ -128,15 +158,21 @@ def resource_to_dict(resource):
         'id': resource.id,
         'title': resource.title,
         'filename': resource.filename,
-        'uploaded_at': resource.uploaded_at.isoformat() if resource.uploaded_at else None
+        'uploaded_at': resource.uploaded_at.isoformat() if resource.uploaded_at else None,
+        'content_type': resource.content_type,
+        'size': resource.size,
+        'sha256': resource.sha256,
+        'url': blob_url(resource.blob_key) if resource.blob_key else None,
     }
 
-def group_to_dict(group):
+def group_to_dict(group, client_ids=None):
+    if client_ids is None:
+        client_ids = _group_member_ids([group.id]).get(group.id, [])
     return {
         'id': group.id,
         'name': group.name,
         'description': group.description,
-        'client_ids': json.loads(group.client_ids) if group.client_ids else []
+        'client_ids': client_ids
     }
 
 def daily_checkin_to_dict(checkin):
@@ -212,9 +248,12 @@ def achievement_to_dict(achievement):
 def exercise_to_dict(exercise):
     # Determine URL for media - prefer local file if available
     gif_url = exercise.media_url
+    poster_url = thumbnail_url = None
     if exercise.local_media_path:
         filename = os.path.basename(exercise.local_media_path)
         gif_url = f"/media/exercises/{urllib.parse.quote(filename)}"
+        poster_url = f"{gif_url}?variant=poster"
+        thumbnail_url = f"{gif_url}?variant=thumb"
     
     instructions_raw = exercise.instructions
     instructions = []
@@ -254,6 +293,8 @@ def exercise_to_dict(exercise):
         "instructions": instructions,
         "mediaUrl": gif_url,
         "gifUrl": gif_url,
+        "posterUrl": poster_url,
+        "thumbnailUrl": thumbnail_url,
         "category": exercise.bodyPart,
         "equipment": exercise.equipment,
         "muscles": muscles,
@@ -275,34 +316,62 @@ def find_client(identifier):
     """Fetch a client by primary key ID or unique_url."""
     return Client.query.filter(or_(Client.id == identifier, Client.unique_url == identifier), Client.deleted == False).first()
 
+def _group_member_ids(group_ids):
+    """Maps each group id to its member client ids with one indexed query."""
+    members = {group_id: [] for group_id in group_ids}
+    rows = db.session.query(group_membership.c.group_id, group_membership.c.client_id) \
+        .filter(group_membership.c.group_id.in_(group_ids)).all()
+    for group_id, client_id in rows:
+        members[group_id].append(client_id)
+    return members
+
+def _set_group_members(group_id, client_ids):
+    """Replaces a group's membership with the given (existing, non-deleted) clients. Caller commits."""
+    client_ids = list(dict.fromkeys(client_ids))
+    valid_ids = {row.id for row in db.session.query(Client.id).filter(Client.id.in_(client_ids), Client.deleted == False)} if client_ids else set()
+    db.session.execute(group_membership.delete().where(group_membership.c.group_id == group_id))
+    rows = [{'group_id': group_id, 'client_id': cid} for cid in client_ids if cid in valid_ids]
+    if rows:
+        db.session.execute(group_membership.insert(), rows)
+    return [row['client_id'] for row in rows]
+
 # In a real application, this would be a more secure way to handle secrets
 TRAINER_PASSWORD = os.environ.get("TRAINER_PASSWORD", "duck")
 
-LEGACY_JSON_DIR = pathlib.Path(__file__).resolve().parent / 'database'
-WORKOUT_ASSIGNMENTS_PATH = LEGACY_JSON_DIR / 'workout_assignments.json'
-WORKOUT_TEMPLATES_PATH = LEGACY_JSON_DIR / 'workout_templates.json'
+EXERCISE_CATALOG = 'exercises'
+FOOD_CATALOG = 'foods'
 
-def _read_legacy_workout_assignments():
-    try:
-        import json
-        if WORKOUT_ASSIGNMENTS_PATH.exists():
-            with open(WORKOUT_ASSIGNMENTS_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-    except Exception as e:
-        app.logger.error(f"Error reading legacy workout assignments: {e}")
-    return []
+# Catalog versions live in the database, not the per-process cache, so a bump reaches every worker
+def _catalog_version(name):
+    return db.session.query(CatalogVersion.version).filter_by(name=name).scalar() or 0
 
-def _read_legacy_workout_templates():
-    try:
-        import json
-        if WORKOUT_TEMPLATES_PATH.exists():
-            with open(WORKOUT_TEMPLATES_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-    except Exception as e:
-        app.logger.error(f"Error reading legacy workout templates: {e}")
-    return []
+def _bump_catalog_version(name):
+    for _ in range(2):
+        bumped = db.session.execute(update(CatalogVersion).where(CatalogVersion.name == name)
+                                    .values(version=CatalogVersion.version + 1)).rowcount
+        if not bumped:
+            db.session.add(CatalogVersion(name=name, version=1))
+        try:
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Another worker created the row first; bump that one instead
+            db.session.rollback()
+
+def _exercise_catalog_version():
+    return _catalog_version(EXERCISE_CATALOG)
+
+def _bump_exercise_catalog_version():
+    """Invalidates catalog-derived caches after exercises are added, changed or removed."""
+    _bump_catalog_version(EXERCISE_CATALOG)
+    cache.delete('exercises_all')
+
+def _food_catalog_version():
+    return _catalog_version(FOOD_CATALOG)
+
+def _bump_food_catalog_version():
+    """Invalidates the food search index and recipe macros after foods are imported."""
+    _bump_catalog_version(FOOD_CATALOG)
 
 def _normalize_client_id(raw_id):
     return raw_id.replace('/client/','') if raw_id.startswith('/client/') else raw_id
@@ -337,6 +406,24 @@ def _to_float(value):
     except (ValueError, TypeError):
         return None
 
+def _to_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (ValueError, TypeError):
+        return None
+
+MAX_DATE_RANGE_DAYS = 366
+
+def _date_range(args, default_start, default_days=28):
+    """Parses ?from=&to= (YYYY-MM-DD) into (start, end, error); defaults to `default_days` from `default_start`."""
+    range_start = _to_date(args.get('from')) or default_start
+    range_end = _to_date(args.get('to')) or range_start + timedelta(days=default_days - 1)
+    if range_end < range_start:
+        return None, None, "'to' must not be before 'from'"
+    if (range_end - range_start).days >= MAX_DATE_RANGE_DAYS:
+        return None, None, f"Range is limited to {MAX_DATE_RANGE_DAYS} days"
+    return range_start, range_end, None
+
 # --- API Endpoints ---
 @app.route("/api/login", methods=["POST"])
 def login():
@@ -354,6 +441,7 @@ def sync_exercisedb_data():
     """Synchronizes exercises from the external exercise database."""
     try:
         sync_exercises_from_exercisedb()
+        _bump_exercise_catalog_version()
         return jsonify({"message": "Exercises synchronized successfully!"}), 200
     except Exception as e:
         app.logger.error(f"Error synchronizing exercises: {e}")
@@ -516,18 +604,23 @@ def get_client_today(client_id):
     
     today = date.today()
     
-    # Get workout for today (simplified for now)
+    # Get workout for today from the assignment's calendar
     try:
         assignment = ProgramAssignment.query.filter_by(client_id=client.id, active=True).first()
+        template = WorkoutTemplate.query.get(assignment.template_id) if assignment else None
         workout = None
-        if assignment:
+        if assignment and template:
+            session = get_assignment_calendar(assignment, template).session_for(today)
             workout = {
                 "assigned": True,
-                "templateName": "Today's Workout",
-                "exercises": 8,
-                "estimatedDuration": 45
+                "scheduled": session is not None,
+                "dayIndex": session['day_index'] if session else None,
+                "templateName": (session and session['name']) or assignment.custom_name or template.name,
+                "exercises": session['exercise_count'] if session else 0,
+                "estimatedDuration": 45 if session else 0
             }
-    except Exception:
+    except Exception as e:
+        app.logger.warning(f"Could not resolve today's workout for client {client.id}: {e}")
         workout = None
 
     # Get today's metrics (simplified)
@@ -578,6 +671,27 @@ def get_templates():
     templates = WorkoutTemplate.query.order_by(WorkoutTemplate.name).all()
     return jsonify([template.to_dict() for template in templates])
 
+@app.route("/api/templates/summaries", methods=["GET"])
+@protected
+def get_template_summaries():
+    """Lists templates for the picker without their days payload; fetch a template for its days."""
+    templates = WorkoutTemplate.query.options(defer(WorkoutTemplate.days)).order_by(WorkoutTemplate.name).all()
+    stale = [t.id for t in templates if t.day_count is None or t.exercise_count is None]
+    if stale:
+        # Rows written outside the API (seed scripts) have no counts yet. Backfilled with a Core
+        # update pinning updated_at, which keys the template cache and ETags and must not move
+        for template_id, raw_days in db.session.query(WorkoutTemplate.id, WorkoutTemplate.days) \
+                .filter(WorkoutTemplate.id.in_(stale)):
+            day_count, exercise_count = summarize_days(parse_days(raw_days))
+            db.session.execute(
+                update(WorkoutTemplate)
+                .where(WorkoutTemplate.id == template_id)
+                .values(day_count=day_count, exercise_count=exercise_count, updated_at=WorkoutTemplate.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    return jsonify([template.to_summary_dict() for template in templates])
+
 @app.route("/api/templates/<template_id>", methods=["GET"])
 @protected
 def get_template(template_id):
@@ -594,7 +708,10 @@ def create_template():
         name=data.get('name', 'Untitled Template'),
         days=data.get('days', '[]')
     )
+    new_template.refresh_summary()
     db.session.add(new_template)
+    db.session.flush()
+    snapshot_template(new_template)
     db.session.commit()
     return jsonify(new_template.to_dict()), 201
 
@@ -608,10 +725,36 @@ def update_template(template_id):
     data = request.get_json()
     template.name = data.get('name', template.name)
     template.days = data.get('days', template.days)
+    template.refresh_summary()
+    # Edits become a new version; assignments pinned to earlier versions keep what they were given
+    snapshot_template(template)
     
+    invalidate_compiled_programs(template_id=template.id, unpinned_only=True)
     db.session.commit()
+    template_cache.invalidate(template.id)
     return jsonify(template.to_dict())
 
+@app.route("/api/templates/<template_id>/versions", methods=["GET"])
+@protected
+def get_template_versions(template_id):
+    """Lists a template's immutable versions, newest first."""
+    if not WorkoutTemplate.query.get(template_id):
+        return jsonify({"message": "Template not found"}), 404
+    versions = WorkoutTemplateVersion.query.filter_by(template_id=template_id) \
+        .order_by(WorkoutTemplateVersion.version.desc()).all()
+    return jsonify([v.to_dict() for v in versions])
+
+@app.route("/api/templates/<template_id>/versions/<int:version>", methods=["GET"])
+@protected
+def get_template_version(template_id, version):
+    """Returns a template version with its days, e.g. to see exactly what a client was assigned."""
+    template_version = WorkoutTemplateVersion.query.filter_by(template_id=template_id, version=version).first()
+    if not template_version:
+        return jsonify({"message": "Template version not found"}), 404
+    result = template_version.to_dict()
+    result['days'] = get_version_days(template_version)
+    return jsonify(result)
+
 @app.route("/api/workout-assignments", methods=["GET"])
 @protected
 def get_workout_assignments():
@@ -641,6 +784,7 @@ def create_client_workout_assignment(client_id):
     assignment = ProgramAssignment(
         client_id=client_id,
         template_id=data.get('template_id'),
+        template_version_id=ensure_current_version(template).id,
         custom_name=data.get('custom_name'),
         enabled_days=json.dumps(data.get('enabled_days', [])),
         day_customizations=json.dumps(data.get('day_customizations', {})),
@@ -672,6 +816,11 @@ def update_client_workout_assignment(client_id):
         assignment.day_customizations = json.dumps(data['day_customizations'])
     if 'notes' in data:
         assignment.notes = data['notes']
+    if data.get('upgrade_to_latest_version'):
+        template = WorkoutTemplate.query.get(assignment.template_id)
+        if template:
+            assignment.template_version_id = ensure_current_version(template).id
+    invalidate_compiled_programs(assignment_id=assignment.id)
     
     db.session.commit()
     return jsonify(assignment.to_dict())
@@ -690,6 +839,8 @@ def get_client_workout_assignment(client_id):
     result = assignment.to_dict()
     if template:
         result['template'] = template.to_dict()
+    if assignment.template_version:
+        result['template_version'] = assignment.template_version.to_dict()
     
     return jsonify(result)
 
@@ -729,6 +880,7 @@ def customize_client_exercise(client_id):
             substitute_exercise_id=data.get('substitute_exercise_id')
         )
         db.session.add(customization)
+    invalidate_compiled_programs(assignment_id=assignment.id)
     
     db.session.commit()
     return jsonify(customization.to_dict())
@@ -758,15 +910,11 @@ def get_client_exercises(client_id):
 
     if not assignment:
         # Fallback: legacy JSON assignments file
-        legacy_assignments = _read_legacy_workout_assignments()
-        legacy = next((a for a in legacy_assignments if a['client_id'] == client_id), None)
+        legacy = legacy_assignments.get(client_id)
         if legacy:
             template = WorkoutTemplate.query.get(legacy['template_id'])
             if template:
-                try:
-                    days_data = json.loads(template.days) if template.days else []
-                except json.JSONDecodeError:
-                    days_data = []
+                days_data = get_template_days(template)
                 return jsonify({
                     "assignmentId": legacy['id'],
                     "startDate": legacy.get('date'),
@@ -800,53 +948,20 @@ def get_client_exercises(client_id):
             }
         })
 
-    try:
-        days_data = json.loads(template.days) if template.days else []
-    except json.JSONDecodeError:
-        days_data = []
-
-    # Apply client-specific customizations
-    enabled_days = json.loads(assignment.enabled_days or '[]') if hasattr(assignment, 'enabled_days') and assignment.enabled_days else list(range(len(days_data)))
-    day_customizations = json.loads(assignment.day_customizations or '{}') if hasattr(assignment, 'day_customizations') and assignment.day_customizations else {}
-    
-    # Filter days based on enabled_days and apply customizations
-    filtered_days = []
-    for i, day in enumerate(days_data):
-        if i in enabled_days:
-            # Apply day-specific customizations if they exist
-            customized_day = day.copy() if isinstance(day, dict) else day
-            if str(i) in day_customizations:
-                day_custom = day_customizations[str(i)]
-                # Apply any day-level customizations here
-                if 'name' in day_custom:
-                    customized_day['name'] = day_custom['name']
-                if 'description' in day_custom:
-                    customized_day['description'] = day_custom['description']
-            filtered_days.append(customized_day)
-
-    # Get exercise-level customizations
-    exercise_customizations = {}
-    if hasattr(assignment, 'exercise_customizations'):
-        for custom in assignment.exercise_customizations:
-            key = f"{custom.day_index}_{custom.exercise_id}"
-            exercise_customizations[key] = custom.to_dict()
-
-    payload = {
+    workout_json, workout_etag = get_compiled_program(assignment, template)
+    envelope_json = json.dumps({
         "assignmentId": assignment.id,
         "startDate": assignment.start_date.isoformat() if assignment.start_date else None,
         "currentDayIndex": assignment.current_day_index,
-        "customName": assignment.custom_name if hasattr(assignment, 'custom_name') else None,
-        "notes": assignment.notes if hasattr(assignment, 'notes') else None,
-        "workout": {
-            "id": template.id,
-            "templateId": template.id,
-            "templateName": assignment.custom_name or template.name,
-            "days": filtered_days,
-            "exerciseCustomizations": exercise_customizations
-        }
-    }
+        "customName": assignment.custom_name,
+        "notes": assignment.notes,
+    }, separators=(',', ':'), sort_keys=True)
 
-    return jsonify(payload)
+    # The compiled workout is stored pre-serialised; splice it in rather than re-encoding it
+    response = app.response_class(envelope_json[:-1] + ',"workout":' + workout_json + '}', mimetype='application/json')
+    response.set_etag(hashlib.sha256((workout_etag + envelope_json).encode('utf-8')).hexdigest()[:32])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route("/api/exercises", methods=["POST"])
 @protected
@@ -871,6 +986,7 @@ def add_exercise():
     )
     db.session.add(new_exercise)
     db.session.commit()
+    _bump_exercise_catalog_version()
     return jsonify({"exercise": exercise_to_dict(new_exercise)}), 201
 
 @app.route("/api/exercises/<exercise_id>", methods=["PUT"])
@@ -899,6 +1015,7 @@ def update_exercise(exercise_id):
         exercise.target = data["target"]
     
     db.session.commit()
+    _bump_exercise_catalog_version()
     return jsonify({"exercise": exercise_to_dict(exercise)})
 
 @app.route("/api/exercises/<exercise_id>", methods=["DELETE"])
@@ -910,15 +1027,171 @@ def delete_exercise(exercise_id):
     
     db.session.delete(exercise)
     db.session.commit()
+    _bump_exercise_catalog_version()
     return jsonify({"message": "Exercise deleted successfully"})
 
+@app.route("/api/exercises/<exercise_id>/substitutes", methods=["GET"])
+@protected
+def get_exercise_substitutes(exercise_id):
+    """
+    Returns the top-k substitutes for an exercise ranked by similarity of target muscle,
+    secondary muscles, body part and equipment. Accepts 'k' and an 'equipment' filter
+    (comma-separated or repeated) limiting results to equipment the client has.
+    """
+    k = _to_int(request.args.get('k')) or 10
+    k = max(1, min(k, 50))
+    equipment = [e for value in request.args.getlist('equipment') for e in value.split(',') if e.strip()]
+
+    index = get_similarity_index(_exercise_catalog_version())
+    ranked = index.top_k(exercise_id, k=k, equipment=equipment or None)
+    if ranked is None:
+        return jsonify({"message": "Exercise not found!"}), 404
+
+    exercises = {e.id: e for e in Exercise.query.filter(Exercise.id.in_([ex_id for ex_id, _ in ranked])).all()}
+    substitutes = []
+    for ex_id, score in ranked:
+        if ex_id in exercises:
+            substitutes.append({**exercise_to_dict(exercises[ex_id]), "score": score})
+
+    return jsonify({"exercise_id": exercise_id, "substitutes": substitutes})
+
+@app.route('/api/exercises/media/variants', methods=['POST'])
+@protected
+def generate_exercise_media():
+    """
+    Queues poster, thumbnail and compact animated variants for downloaded exercise
+    media; poll GET for progress. `python -m backend.media_service` runs it in the foreground.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        summary = queue_exercise_media_variants(force=bool(data.get('force')))
+        return jsonify(summary), 202
+    except Exception as e:
+        app.logger.error(f"Error queueing exercise media variants: {e}")
+        return jsonify({"message": "Failed to queue media variants."}), 500
+
+@app.route('/api/exercises/media/variants', methods=['GET'])
+@protected
+def get_exercise_media_status():
+    summary = exercise_media_variants_status()
+    if summary is None:
+        return jsonify({"message": "No media variant run queued"}), 404
+    return jsonify(summary)
+
 @app.route('/media/exercises/<path:filename>')
 def serve_exercise_media(filename):
-    media_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'exercise_media')
-    return send_from_directory(media_dir, filename)
+    """Serves exercise media, picking a variant via ?variant= or the Accept header."""
+    accept_webp = any(mimetype == 'image/webp' and quality > 0 for mimetype, quality in request.accept_mimetypes)
+    served_name, negotiated = resolve_media_variant(
+        EXERCISE_MEDIA_ROOT, filename,
+        variant=request.args.get('variant'),
+        accept_webp=accept_webp,
+    )
+    response = send_media(EXERCISE_MEDIA_ROOT, served_name)
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
+# Progress photos saved under uploads/ are named <client_id>_<32 hex>_<secure filename>
+_UPLOADED_PHOTO_NAME = re.compile(r'^[0-9a-f-]{36}_[0-9a-f]{32}_[\w.-]+$')
+
+@app.route('/uploads/<path:filename>')
+def serve_upload(filename):
+    """Serves progress photos saved under uploads/; names are unique so they never change."""
+    # Only files that belong to a stored photo are served, never anything else dropped into uploads/
+    if not _UPLOADED_PHOTO_NAME.match(filename):
+        return jsonify({"message": "Not found"}), 404
+    photo = ProgressPhoto.query.filter_by(filename=filename, blob_key=None).first()
+    if not photo or not filename.startswith(f"{photo.client_id}_"):
+        return jsonify({"message": "Not found"}), 404
+    # Originals carry EXIF (GPS, device); once metadata-free variants exist, only those are served
+    if photo.processing_status == PHOTO_STATUS_READY:
+        return jsonify({"message": "Not found"}), 404
+    return send_media(UPLOADS_ROOT, filename, max_age=ONE_YEAR, immutable=True, public=False)
+
+@app.route('/blobs/<path:key>')
+def serve_blob(key):
+    """Serves an uploaded blob; content-addressed keys never change, so they are cached for a year."""
+    # Only uploads are public here; explicitly keyed documents (e.g. workout sessions) are not
+    if not is_content_key(key):
+        return jsonify({"message": "Not found"}), 404
+    # Photos uploaded before originals got private keys: their EXIF-laden original is content-addressed
+    if db.session.query(ProgressPhoto.id).filter_by(blob_key=key).first():
+        return jsonify({"message": "Not found"}), 404
+    storage = get_blob_storage()
+    url = storage.url(key)
+    if url:
+        return redirect(url)
+    return send_media(storage.root, key, max_age=ONE_YEAR, immutable=True, public=False)
 
 # --- New Endpoints for Program & Meal Plan ---
 
+@app.route("/api/clients/<client_id>/program/schedule", methods=["GET"])
+def get_program_schedule_for_client(client_id):
+    """Lists the active assignment's scheduled sessions between ?from= and ?to=."""
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    assignment = ProgramAssignment.query.filter_by(client_id=client.id, active=True).first()
+    template = WorkoutTemplate.query.get(assignment.template_id) if assignment else None
+    if not assignment or not template:
+        return jsonify({"message": "No active program assigned"}), 404
+
+    range_start, range_end, error = _date_range(request.args, date.today())
+    if error:
+        return jsonify({"message": error}), 400
+    calendar = get_assignment_calendar(assignment, template)
+    return jsonify({
+        "assignmentId": assignment.id,
+        "startDate": calendar.start_date.isoformat(),
+        "cycleLength": len(calendar),
+        "sessions": [{"date": d.isoformat(), **session} for d, session in calendar.sessions_in_range(range_start, range_end)],
+    })
+
+@app.route("/api/clients/<client_id>/calendar", methods=["GET"])
+def get_client_calendar(client_id):
+    """
+    Month grid for ?month=YYYY-MM (default: current month). `days` holds one
+    status code per day of the month; see `legend`.
+    """
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    month_param = request.args.get('month')
+    try:
+        first = datetime.strptime(month_param, '%Y-%m').date() if month_param else date.today().replace(day=1)
+    except ValueError:
+        return jsonify({"message": "Invalid month format. Use YYYY-MM"}), 400
+    last = first.replace(day=monthrange(first.year, first.month)[1])
+
+    logs = db.session.query(WorkoutLog.actual_date, WorkoutLog.day_index_completed) \
+        .filter(WorkoutLog.client_id == client.id,
+                WorkoutLog.actual_date >= first,
+                WorkoutLog.actual_date <= last) \
+        .all()
+    completed = {}
+    for actual_date, day_index in logs:
+        completed.setdefault(actual_date, []).append(day_index)
+
+    assignment = ProgramAssignment.query.filter_by(client_id=client.id, active=True).first()
+    template = WorkoutTemplate.query.get(assignment.template_id) if assignment else None
+    calendar = get_assignment_calendar(assignment, template) if assignment and template else None
+
+    sessions = {}
+    if calendar:
+        for d, session in calendar.sessions_in_range(first, last):
+            sessions[d.day] = {"dayIndex": session['day_index'], "name": session['name']}
+    for d, day_indexes in completed.items():
+        sessions.setdefault(d.day, {})["completedDayIndexes"] = day_indexes
+
+    return jsonify({
+        "month": first.strftime('%Y-%m'),
+        "assignmentId": assignment.id if calendar else None,
+        "days": day_statuses(calendar, first, last, completed.keys(), date.today()),
+        "legend": STATUS_CODES,
+        "sessions": sessions,
+    })
+
 # 1. Get the active workout program for a client
 @app.route("/api/clients/<client_id>/program/active", methods=["GET"])
 def get_active_program(client_id):
@@ -936,18 +1209,13 @@ def get_active_program(client_id):
 
     if not assignment:
         # Fallback: legacy JSON assignments file
-        legacy_assignments = _read_legacy_workout_assignments()
         # match by exact id or by stripping '/client/' prefix
-        identifier_variants = {client_id}
-        if client_id.startswith('/client/'):
-            identifier_variants.add(client_id.replace('/client/',''))
-        legacy = next((a for a in legacy_assignments if a['client_id'] in identifier_variants), None)
+        legacy = legacy_assignments.get(client_id, _normalize_client_id(client_id))
         if legacy:
             template = WorkoutTemplate.query.get(legacy['template_id'])
             if template is None:
                 # attempt to read from JSON file
-                legacy_templates = _read_legacy_workout_templates()
-                template_dict = next((t for t in legacy_templates if t['id'] == legacy['template_id']), None)
+                template_dict = legacy_templates.get(legacy['template_id'])
                 if template_dict:
                     # Build days_data from legacy structure
                     if 'days' in template_dict and template_dict['days']:
@@ -971,10 +1239,7 @@ def get_active_program(client_id):
                         }
                     })
             else:
-                try:
-                    days_data = json.loads(template.days) if template.days else []
-                except json.JSONDecodeError:
-                    days_data = []
+                days_data = get_template_days(template)
                 return jsonify({
                     "assignmentId": legacy['id'],
                     "startDate": legacy.get('date'),
@@ -1008,10 +1273,7 @@ def get_active_program(client_id):
             }
         })
 
-    try:
-        days_data = json.loads(template.days) if template.days else []
-    except json.JSONDecodeError:
-        days_data = []
+    days_data = get_assignment_days(assignment, template)
 
     payload = {
         "assignmentId": assignment.id,
@@ -1032,7 +1294,11 @@ def get_active_program(client_id):
 @app.route("/api/clients/<client_id>/meal-plan", methods=["GET"])
 def get_client_meal_plan(client_id):
     """Returns the latest assigned meal-plan for the given client (or 204 if none)."""
-    meal_plan = MealPlan.query.filter_by(client_id=client_id).order_by(MealPlan.assigned_date.desc()).first()
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    meal_plan = MealPlan.query.options(joinedload(MealPlan.recipe)) \
+        .filter_by(client_id=client.id).order_by(MealPlan.assigned_date.desc()).first()
 
     if not meal_plan:
         # 204 No Content is handled specially by the front-end helper so it resolves to `null`
@@ -1040,7 +1306,169 @@ def get_client_meal_plan(client_id):
 
     return jsonify(meal_plan_to_dict(meal_plan))
 
+@app.route("/api/clients/<client_id>/meal-plans", methods=["GET"])
+def get_client_meal_plans(client_id):
+    """Meal plans with recipe details between ?from= and ?to= (default: the current Monday-Sunday week)."""
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    today = date.today()
+    range_start, range_end, error = _date_range(request.args, today - timedelta(days=today.weekday()), default_days=7)
+    if error:
+        return jsonify({"message": error}), 400
+
+    meal_plans = MealPlan.query.options(joinedload(MealPlan.recipe)) \
+        .filter(MealPlan.client_id == client.id,
+                MealPlan.assigned_date >= range_start,
+                MealPlan.assigned_date <= range_end) \
+        .order_by(MealPlan.assigned_date) \
+        .all()
+    recipes = {mp.recipe.id: mp.recipe for mp in meal_plans if mp.recipe}
+    macros = recipe_macro_engine.per_serving_many(recipes.values(), _food_catalog_version())
+    return jsonify({
+        "from": range_start.isoformat(),
+        "to": range_end.isoformat(),
+        "meal_plans": [meal_plan_to_dict(mp, include_recipe=True, recipe_macros=macros) for mp in meal_plans],
+    })
+
+@app.route("/api/recipes/<recipe_id>/macros", methods=["GET"])
+def get_recipe_macros(recipe_id):
+    """Macros computed from the recipe's ingredients, per serving and for ?servings= (default 1)."""
+    recipe = Recipe.query.get(recipe_id)
+    if not recipe:
+        return jsonify({"message": "Recipe not found!"}), 404
+    servings = _to_float(request.args.get('servings'))
+    if servings is None:
+        servings = 1
+    if servings <= 0:
+        return jsonify({"message": "servings must be positive"}), 400
+
+    result = recipe_macro_engine.per_serving_many([recipe], _food_catalog_version())[recipe.id]
+    return jsonify({
+        "recipe_id": recipe.id,
+        "recipe_servings": recipe.servings,
+        "servings": servings,
+        "per_serving": result['per_serving'],
+        "total": scale_macros(result['per_serving'], servings),
+        "unresolved": result['unresolved'],
+    })
+
+@app.route("/api/meal-plans/totals", methods=["POST"])
+@protected
+def get_meal_plan_totals():
+    """
+    Daily and overall macros of planned meals (one serving each) for many clients.
+    Body: {"client_ids": [...], "from": "YYYY-MM-DD", "to": "YYYY-MM-DD"}; dates default to the current week.
+    """
+    data = request.get_json(silent=True) or {}
+    client_ids = data.get('client_ids')
+    if not isinstance(client_ids, list) or not client_ids:
+        return jsonify({"message": "client_ids must be a non-empty list"}), 400
+    today = date.today()
+    range_start, range_end, error = _date_range(data, today - timedelta(days=today.weekday()), default_days=7)
+    if error:
+        return jsonify({"message": error}), 400
+
+    # Same lookup as find_client (id or unique_url, not deleted), for every requested client at once
+    identifiers = list(dict.fromkeys(str(c) for c in client_ids))
+    found = Client.query.filter(or_(Client.id.in_(identifiers), Client.unique_url.in_(identifiers)),
+                                Client.deleted == False).all()
+    resolved = {}
+    for client in found:
+        for identifier in (client.id, client.unique_url):
+            if identifier in identifiers:
+                resolved[identifier] = client.id
+    unknown = [identifier for identifier in identifiers if identifier not in resolved]
+    if unknown:
+        return jsonify({"message": "Client not found!", "client_ids": unknown}), 404
+
+    meal_plans = MealPlan.query.options(joinedload(MealPlan.recipe)) \
+        .filter(MealPlan.client_id.in_(set(resolved.values())),
+                MealPlan.assigned_date >= range_start,
+                MealPlan.assigned_date <= range_end) \
+        .order_by(MealPlan.assigned_date) \
+        .all()
+    recipes = {mp.recipe.id: mp.recipe for mp in meal_plans if mp.recipe}
+    macros = recipe_macro_engine.per_serving_many(recipes.values(), _food_catalog_version())
+
+    per_client = {}
+    for mp in meal_plans:
+        if mp.recipe_id not in macros:
+            continue
+        per_serving = macros[mp.recipe_id]['per_serving']
+        entry = per_client.setdefault(mp.client_id, {"days": {}, "total": dict.fromkeys(per_serving, 0.0)})
+        day = entry["days"].setdefault(mp.assigned_date.isoformat(), dict.fromkeys(per_serving, 0.0))
+        for field, value in per_serving.items():
+            day[field] = round(day[field] + value, 1)
+            entry["total"][field] = round(entry["total"][field] + value, 1)
+    return jsonify({
+        "from": range_start.isoformat(),
+        "to": range_end.isoformat(),
+        # Keyed the way each client was requested
+        "clients": {identifier: per_client[client_id] for identifier, client_id in resolved.items()
+                    if client_id in per_client},
+        "unresolved": {rid: list(r['unresolved']) for rid, r in macros.items() if r['unresolved']},
+    })
+
 # --- Nutrition Log Endpoints ---
+# --- Food Database Endpoints ---
+def _food_serving_grams(food, data):
+    """Grams for a food-linked log from serving_grams, or servings of the food's typical serving (else 100 g)."""
+    serving_grams = _to_float(data.get('serving_grams'))
+    if serving_grams is None:
+        servings = _to_float(data.get('servings'))
+        serving_grams = (servings if servings is not None else 1) * (food.serving_size_g or 100)
+    return serving_grams if serving_grams > 0 else None
+
+@app.route("/api/foods/import", methods=["POST"])
+@protected
+def import_food_dataset():
+    """Bulk-imports foods from an uploaded CSV or JSON-lines dataset (per-100 g nutrients)."""
+    if 'file' not in request.files:
+        return jsonify({"message": "No file provided"}), 400
+    file = request.files['file']
+    fmt = request.form.get('format') or ('csv' if file.filename.lower().endswith('.csv') else 'jsonl')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({"message": "format must be csv or jsonl"}), 400
+    try:
+        summary = import_foods(file.stream, fmt)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error importing foods: {e}")
+        return jsonify({"message": "Failed to import foods."}), 500
+    finally:
+        # Earlier batches may have been committed even if a later one failed
+        _bump_food_catalog_version()
+    return jsonify(summary), 200
+
+@app.route("/api/foods/search", methods=["GET"])
+def search_foods():
+    """Prefix/fuzzy food search; ?client_id= ranks the client's recently logged foods higher."""
+    query = (request.args.get('q') or '').strip()
+    limit = min(max(_to_int(request.args.get('limit')) or 20, 1), 100)
+    if not query:
+        return jsonify([])
+
+    usage = {}
+    if request.args.get('client_id'):
+        client = find_client(request.args['client_id'])
+        if client:
+            usage = client_food_usage(client.id)
+
+    hits = get_food_index(_food_catalog_version()).search(query, limit=limit, usage=usage)
+    foods = {f.id: f for f in Food.query.filter(Food.id.in_([food_id for food_id, _ in hits])).all()} if hits else {}
+    return jsonify([
+        {**foods[food_id].to_dict(), 'score': score, 'recent_uses': usage.get(food_id, 0)}
+        for food_id, score in hits if food_id in foods
+    ])
+
+@app.route("/api/foods/<food_id>", methods=["GET"])
+def get_food(food_id):
+    food = Food.query.get(food_id)
+    if not food:
+        return jsonify({"message": "Food not found!"}), 404
+    return jsonify(food.to_dict())
+
 @app.route("/api/clients/<client_id>/nutrition-logs", methods=["GET"])
 def get_nutrition_logs(client_id):
     """Get nutrition logs for a client, optionally filtered by date."""
@@ -1073,13 +1501,26 @@ def add_nutrition_log(client_id):
     if not data:
         return jsonify({"message": "No data provided"}), 400
     
+    food = None
+    if data.get('food_id'):
+        food = Food.query.get(data['food_id'])
+        if not food:
+            return jsonify({"message": "Food not found!"}), 404
+        serving_grams = _food_serving_grams(food, data)
+        if serving_grams is None:
+            return jsonify({"message": "serving_grams must be a positive number"}), 400
+
     try:
-        # Create nutrition log entry
-        nutrition_log = NutritionLog(
-            client_id=client.id,
-            log_date=date.today() if not data.get('log_date') else datetime.strptime(data.get('log_date'), '%Y-%m-%d').date(),
-            food_item=data.get('food_item', ''),
-            macros=json.dumps({
+        if food:
+            # Macros come from the food table rather than the request
+            macros = {
+                **food_macros(food, serving_grams),
+                'serving_size': data.get('serving_size') or f"{serving_grams:g} g",
+                'serving_grams': serving_grams,
+                'meal_type': data.get('meal_type', 'other')
+            }
+        else:
+            macros = {
                 'calories': float(data.get('calories', 0)),
                 'protein': float(data.get('protein', 0)),
                 'carbs': float(data.get('carbs', 0)),
@@ -1089,10 +1530,19 @@ def add_nutrition_log(client_id):
                 'sodium': float(data.get('sodium', 0)),
                 'serving_size': data.get('serving_size', ''),
                 'meal_type': data.get('meal_type', 'other')
-            })
+            }
+
+        # Create nutrition log entry
+        nutrition_log = NutritionLog(
+            client_id=client.id,
+            log_date=date.today() if not data.get('log_date') else datetime.strptime(data.get('log_date'), '%Y-%m-%d').date(),
+            food_item=data.get('food_item') or (food.name if food else ''),
+            food_id=food.id if food else None,
+            macros=json.dumps(macros)
         )
         
         db.session.add(nutrition_log)
+        record_log_added(nutrition_log)
         db.session.commit()
         
         return jsonify({
@@ -1125,7 +1575,23 @@ def update_nutrition_log(client_id, log_id):
         if 'food_item' in data:
             log.food_item = data['food_item']
         
-        if any(key in data for key in ['calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium', 'serving_size', 'meal_type']):
+        food = Food.query.get(log.food_id) if log.food_id else None
+        if food and ('serving_grams' in data or 'servings' in data):
+            serving_grams = _food_serving_grams(food, data)
+            if serving_grams is None:
+                return jsonify({"message": "serving_grams must be a positive number"}), 400
+            old_macros = log.macros
+            current_macros = json.loads(log.macros) if log.macros else {}
+            current_macros.update(food_macros(food, serving_grams))
+            current_macros.update({
+                'serving_size': data.get('serving_size') or f"{serving_grams:g} g",
+                'serving_grams': serving_grams,
+                'meal_type': data.get('meal_type', current_macros.get('meal_type', 'other'))
+            })
+            log.macros = json.dumps(current_macros)
+            record_log_changed(log, old_macros)
+        elif any(key in data for key in ['calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium', 'serving_size', 'meal_type']):
+            old_macros = log.macros
             current_macros = json.loads(log.macros) if log.macros else {}
             current_macros.update({
                 'calories': float(data.get('calories', current_macros.get('calories', 0))),
@@ -1139,6 +1605,7 @@ def update_nutrition_log(client_id, log_id):
                 'meal_type': data.get('meal_type', current_macros.get('meal_type', 'other'))
             })
             log.macros = json.dumps(current_macros)
+            record_log_changed(log, old_macros)
         
         db.session.commit()
         return jsonify({
@@ -1163,6 +1630,7 @@ def delete_nutrition_log(client_id, log_id):
         return jsonify({"message": "Nutrition log not found!"}), 404
     
     try:
+        record_log_removed(log)
         db.session.delete(log)
         db.session.commit()
         return jsonify({"message": "Nutrition log deleted successfully"}), 200
@@ -1172,29 +1640,84 @@ def delete_nutrition_log(client_id, log_id):
         app.logger.error(f"Error deleting nutrition log: {e}")
         return jsonify({"message": "Failed to delete nutrition log"}), 500
 
+@app.route("/api/clients/<client_id>/nutrition-logs/import", methods=["POST"])
+def import_nutrition_diary(client_id):
+    """
+    Imports a CSV diary export. Optional form fields: `mapping` (JSON of
+    field -> CSV column, e.g. {"food_item": "Food Name"}) and `date_format`.
+    Progress is emitted to the client's room as 'nutrition_import_progress'.
+    """
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    if 'file' not in request.files:
+        return jsonify({"message": "No file provided"}), 400
+    try:
+        mapping = json.loads(request.form.get('mapping') or '{}')
+    except json.JSONDecodeError:
+        return jsonify({"message": "mapping must be a JSON object"}), 400
+    if not isinstance(mapping, dict):
+        return jsonify({"message": "mapping must be a JSON object"}), 400
+
+    import_id = f"nimp_{uuid.uuid4()}"
+    room = f"client_{client.id}"
+
+    def report_progress(summary):
+        socketio.emit('nutrition_import_progress', {
+            'import_id': import_id,
+            'rows': summary['rows'],
+            'imported': summary['imported'],
+            'error_count': summary['error_count'],
+        }, room=room)
+
+    try:
+        summary, _ = import_diary_csv(
+            client.id, request.files['file'].stream, mapping=mapping,
+            date_format=request.form.get('date_format') or None, progress=report_progress)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error importing nutrition diary: {e}")
+        return jsonify({"message": "Failed to import nutrition diary"}), 500
+
+    socketio.emit('nutrition_import_complete', {'import_id': import_id, **summary}, room=room)
+    return jsonify({"import_id": import_id, **summary}), 201
+
+@app.route("/api/clients/<client_id>/nutrition-totals", methods=["GET"])
+def get_nutrition_totals(client_id):
+    """Daily and weekly macro totals between ?from= and ?to= (default: the last four weeks)."""
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    range_start, range_end, error = _date_range(request.args, date.today() - timedelta(days=27))
+    if error:
+        return jsonify({"message": error}), 400
+
+    rows = daily_totals(client.id, range_start, range_end)
+    return jsonify({
+        "from": range_start.isoformat(),
+        "to": range_end.isoformat(),
+        "daily": [row.to_dict() for row in rows],
+        "weekly": weekly_totals(rows),
+    })
+
 @app.route("/api/clients/<client_id>/nutrition-goals", methods=["GET"])
 def get_nutrition_goals(client_id):
     """Get nutrition goals for a client."""
     client = find_client(client_id)
     if not client:
         return jsonify({"message": "Client not found!"}), 404
-    
-    # For now, return default goals based on client data
-    # In a real app, these would be stored in the database
-    goals = {
-        'calories': 2000,
-        'protein': 150,
-        'carbs': 200,
-        'fat': 65,
-        'fiber': 25,
-        'water': 8  # glasses
-    }
-    
-    return jsonify(goals)
+    return jsonify(resolve_goals(client))
 
 @app.route("/api/clients/<client_id>/nutrition-goals", methods=["PUT"])
 def update_nutrition_goals(client_id):
-    """Update nutrition goals for a client."""
+    """
+    Update nutrition goals for a client. Send {"mode": "auto", "goal_type": ...}
+    to derive targets from the client's profile, or target values for manual goals.
+    """
     client = find_client(client_id)
     if not client:
         return jsonify({"message": "Client not found!"}), 404
@@ -1202,10 +1725,42 @@ def update_nutrition_goals(client_id):
     data = request.get_json()
     if not data:
         return jsonify({"message": "No data provided"}), 400
-    
-    # For now, just return success
-    # In a real app, these would be stored in the database
-    return jsonify({"message": "Nutrition goals updated successfully"}), 200
+
+    # Omitted settings keep their stored values, so a partial update never resets them
+    goal = NutritionGoal.query.get(client.id) or NutritionGoal(client_id=client.id)
+    mode = data.get('mode', goal.mode or 'manual')
+    if mode not in ('manual', 'auto'):
+        return jsonify({"message": "mode must be 'manual' or 'auto'"}), 400
+    goal_type = data.get('goal_type', goal.goal_type or 'maintain')
+    if goal_type not in GOAL_TYPES:
+        return jsonify({"message": f"goal_type must be one of: {', '.join(GOAL_TYPES)}"}), 400
+    if mode == 'auto' and missing_profile_fields(client):
+        return jsonify({"message": f"Client profile is missing: {', '.join(missing_profile_fields(client))}"}), 400
+
+    goal.mode = mode
+    goal.goal_type = goal_type
+    for field in GOAL_FIELDS:
+        if field in data:
+            value = _to_float(data[field])
+            if value is not None and value < 0:
+                return jsonify({"message": f"{field} must not be negative"}), 400
+            setattr(goal, field, value)
+    db.session.add(goal)
+    db.session.commit()
+    return jsonify({"message": "Nutrition goals updated successfully", "goals": resolve_goals(client)}), 200
+
+@app.route("/api/clients/<client_id>/nutrition-goals/progress", methods=["GET"])
+def get_nutrition_goal_progress(client_id):
+    """Goal vs actual for ?date= (default today), read from the daily rollup."""
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    target_date = date.today()
+    if request.args.get('date'):
+        target_date = _to_date(request.args['date'])
+        if not target_date:
+            return jsonify({"message": "Invalid date format. Use YYYY-MM-DD"}), 400
+    return jsonify(goal_comparison(client, target_date))
 
 # --- Body Stats Endpoints ---
 @app.route("/api/clients/<client_id>/body-stats", methods=["GET"])
@@ -1224,6 +1779,32 @@ def get_body_stats(client_id):
         'measurements': json.loads(stat.measurements) if stat.measurements else {}
     } for stat in stats])
 
+@app.route("/api/clients/<client_id>/body-stats/series", methods=["GET"])
+def get_body_stat_series(client_id):
+    """
+    Chart series with 7/14/30-day rolling averages for ?fields= (comma separated, default weight)
+    between ?from= and ?to= (default: the last 365 days), downsampled to ?points= (default 200).
+    """
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    range_start, range_end, error = _date_range(request.args, date.today() - timedelta(days=364), default_days=365)
+    if error:
+        return jsonify({"message": error}), 400
+    fields = [f.strip() for f in (request.args.get('fields') or 'weight').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in SERIES_FIELDS]
+    if unknown:
+        return jsonify({"message": f"Unknown fields: {', '.join(unknown)}"}), 400
+    points = _to_int(request.args.get('points')) or DEFAULT_SERIES_POINTS
+    points = min(max(points, 3), MAX_SERIES_POINTS)
+
+    return jsonify({
+        "from": range_start.isoformat(),
+        "to": range_end.isoformat(),
+        "points": points,
+        "series": body_stat_series(client.id, range_start, range_end, tuple(dict.fromkeys(fields)), points),
+    })
+
 @app.route("/api/clients/<client_id>/body-stats", methods=["POST"])
 def add_body_stat(client_id):
     """Add a new body stat entry."""
@@ -1272,26 +1853,61 @@ def add_body_stat(client_id):
         app.logger.error(f"Error adding body stat: {e}")
         return jsonify({"message": "Failed to add body stat"}), 500
 
+@app.route("/api/clients/<client_id>/body-stats/import", methods=["POST"])
+def import_client_body_stats(client_id):
+    """
+    Imports smart-scale history from a CSV or JSON-lines file, one entry per day.
+    Optional form fields: `format` (csv or jsonl, default from the file name),
+    `mapping` (JSON of field -> column), `date_format` and `weight_unit` (kg or lb).
+    """
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({"message": "No file provided"}), 400
+    fmt = (request.form.get('format') or '').lower() or \
+        ('jsonl' if (upload.filename or '').lower().endswith(('.jsonl', '.json', '.ndjson')) else 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({"message": "format must be csv or jsonl"}), 400
+    weight_unit = (request.form.get('weight_unit') or '').lower() or None
+    if weight_unit not in (None, 'kg', 'lb'):
+        return jsonify({"message": "weight_unit must be kg or lb"}), 400
+    try:
+        mapping = json.loads(request.form.get('mapping') or '{}')
+    except json.JSONDecodeError:
+        return jsonify({"message": "mapping must be a JSON object"}), 400
+    if not isinstance(mapping, dict):
+        return jsonify({"message": "mapping must be a JSON object"}), 400
+
+    try:
+        summary = import_body_stats(client.id, upload.stream, fmt, mapping=mapping,
+                                    date_format=request.form.get('date_format') or None,
+                                    weight_unit=weight_unit)
+        db.session.commit()
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error importing body stats: {e}")
+        return jsonify({"message": "Failed to import body stats"}), 500
+    return jsonify(summary), 201
+
 # --- Progress Photos Endpoints ---
 @app.route("/api/clients/<client_id>/progress-photos", methods=["GET"])
 def get_progress_photos(client_id):
-    """Get progress photos for a client."""
+    """Get progress photos for a client, with thumbnail and medium variant URLs."""
     client = find_client(client_id)
     if not client:
         return jsonify({"message": "Client not found!"}), 404
     
     photos = ProgressPhoto.query.filter_by(client_id=client.id).order_by(ProgressPhoto.timestamp.desc()).all()
-    return jsonify([{
-        'id': photo.id,
-        'client_id': photo.client_id,
-        'filename': photo.filename,
-        'timestamp': photo.timestamp.isoformat() if photo.timestamp else None,
-        'url': f'/uploads/{photo.filename}'  # Assuming files are served from uploads folder
-    } for photo in photos])
+    return jsonify([progress_photo_to_dict(photo) for photo in photos])
 
 @app.route("/api/clients/<client_id>/progress-photos", methods=["POST"])
 def upload_progress_photo(client_id):
-    """Upload a progress photo."""
+    """Upload a progress photo; variants are generated in the background."""
     client = find_client(client_id)
     if not client:
         return jsonify({"message": "Client not found!"}), 404
@@ -1305,40 +1921,31 @@ def upload_progress_photo(client_id):
     
     if file and allowed_file(file.filename):
         try:
-            import os
-            import uuid
             from werkzeug.utils import secure_filename
             
-            # Create unique filename
             filename = secure_filename(file.filename)
-            unique_filename = f"{client.id}_{uuid.uuid4().hex}_{filename}"
-            
-            # Ensure upload directory exists
-            upload_folder = os.path.join('backend', 'uploads')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            file_path = os.path.join(upload_folder, unique_filename)
-            file.save(file_path)
+            photo_id = str(uuid.uuid4())
+            # Streamed to a private key: the original keeps its EXIF, so it must never be served
+            blob = get_blob_storage().put(file.stream, key=original_key(photo_id, filename),
+                                          content_type=file.mimetype)
             
             # Save to database
             progress_photo = ProgressPhoto(
+                id=photo_id,
                 client_id=client.id,
-                filename=unique_filename,
-                timestamp=datetime.utcnow()
+                filename=filename,
+                blob_key=blob.key,
+                timestamp=datetime.utcnow(),
+                processing_status=PHOTO_STATUS_PROCESSING,
             )
             
             db.session.add(progress_photo)
             db.session.commit()
+            enqueue_photo_variants(app._get_current_object(), progress_photo)
             
             return jsonify({
                 "message": "Photo uploaded successfully",
-                "photo": {
-                    'id': progress_photo.id,
-                    'client_id': progress_photo.client_id,
-                    'filename': progress_photo.filename,
-                    'timestamp': progress_photo.timestamp.isoformat(),
-                    'url': f'/uploads/{progress_photo.filename}'
-                }
+                "photo": progress_photo_to_dict(progress_photo)
             }), 201
             
         except Exception as e:
@@ -1348,6 +1955,17 @@ def upload_progress_photo(client_id):
     
     return jsonify({"message": "Invalid file type"}), 400
 
+@app.route("/api/progress-photos/process-pending", methods=["POST"])
+@protected
+def process_pending_progress_photos():
+    """
+    Queues variant generation for photos that don't have variants yet.
+    ?include_processing=1 also re-queues photos left processing by a restart.
+    """
+    include_processing = request.args.get('include_processing', '').lower() in ('1', 'true', 'yes')
+    queued = enqueue_pending_photos(app._get_current_object(), include_processing=include_processing)
+    return jsonify({"queued": queued}), 202
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -1543,9 +2161,11 @@ def assign_program_to_client(client_id):
         db.session.delete(old)
     db.session.commit()
 
+    template = WorkoutTemplate.query.get(template_id)
     assignment = ProgramAssignment(
         client_id=norm_id,
         template_id=template_id,
+        template_version_id=ensure_current_version(template).id if template else None,
         start_date=start_date,
         active=True,
         current_day_index=0
@@ -1571,20 +2191,176 @@ def unassign_program_from_client(client_id):
         app.logger.warning(f"DB error while unassigning program: {e}")
 
     # Legacy JSON workflow
-    legacy_assignments = _read_legacy_workout_assignments()
-    original_len = len(legacy_assignments)
-    legacy_assignments = [a for a in legacy_assignments if a.get('client_id') != client_id]
-    if len(legacy_assignments) != original_len:
-        import json
-        try:
-            with open(WORKOUT_ASSIGNMENTS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(legacy_assignments, f, indent=4)
+    try:
+        if legacy_assignments.remove_where(lambda a: a.get('client_id') == client_id):
             return jsonify({"message": "Program unassigned (legacy JSON)."})
-        except Exception as e:
-            return jsonify({"message": f"Failed to save legacy assignments: {e}"}), 500
+    except Exception as e:
+        return jsonify({"message": f"Failed to save legacy assignments: {e}"}), 500
 
     return jsonify({"message": "No active assignment found."}), 404
 
+# --- Group Endpoints ---
+@app.route('/api/groups', methods=['GET'])
+@protected
+def get_groups():
+    groups = Group.query.order_by(Group.name).all()
+    members = _group_member_ids([g.id for g in groups])
+    return jsonify([group_to_dict(g, members[g.id]) for g in groups])
+
+@app.route('/api/groups', methods=['POST'])
+@protected
+def create_group():
+    data = request.get_json() or {}
+    if not data.get('name'):
+        return jsonify({'message': 'name is required'}), 400
+
+    group = Group(name=data['name'], description=data.get('description'))
+    db.session.add(group)
+    db.session.flush()
+    client_ids = _set_group_members(group.id, data.get('client_ids', []))
+    db.session.commit()
+    return jsonify(group_to_dict(group, client_ids)), 201
+
+@app.route('/api/groups/<group_id>', methods=['GET'])
+@protected
+def get_group(group_id):
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({'message': 'Group not found'}), 404
+    return jsonify(group_to_dict(group))
+
+@app.route('/api/groups/<group_id>', methods=['PUT'])
+@protected
+def update_group(group_id):
+    """Updates a group's details; a 'client_ids' list replaces its membership."""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({'message': 'Group not found'}), 404
+
+    data = request.get_json() or {}
+    group.name = data.get('name', group.name)
+    group.description = data.get('description', group.description)
+    client_ids = None
+    if 'client_ids' in data:
+        client_ids = _set_group_members(group.id, data['client_ids'])
+    db.session.commit()
+    return jsonify(group_to_dict(group, client_ids))
+
+@app.route('/api/groups/<group_id>', methods=['DELETE'])
+@protected
+def delete_group(group_id):
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({'message': 'Group not found'}), 404
+    db.session.execute(group_membership.delete().where(group_membership.c.group_id == group.id))
+    db.session.delete(group)
+    db.session.commit()
+    return '', 204
+
+@app.route('/api/groups/<group_id>/members', methods=['GET'])
+@protected
+def get_group_members(group_id):
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({'message': 'Group not found'}), 404
+    clients = Client.query.join(group_membership, group_membership.c.client_id == Client.id) \
+        .filter(group_membership.c.group_id == group.id, Client.deleted == False) \
+        .order_by(Client.name).all()
+    return jsonify([client_to_dict(c) for c in clients])
+
+@app.route('/api/clients/<client_id>/groups', methods=['GET'])
+@protected
+def get_client_groups(client_id):
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    groups = Group.query.join(group_membership, group_membership.c.group_id == Group.id) \
+        .filter(group_membership.c.client_id == client.id).order_by(Group.name).all()
+    members = _group_member_ids([g.id for g in groups])
+    return jsonify([group_to_dict(g, members[g.id]) for g in groups])
+
+@app.route('/api/groups/<group_id>/programs/assign', methods=['POST','OPTIONS'])
+@protected
+def assign_program_to_group(group_id):
+    """Assigns a template to every member of a group in a single transaction.
+
+    Existing active assignments are deactivated and new ones inserted with
+    set-based statements. Because of the (client_id, active) unique constraint,
+    each member's previously deactivated assignment is removed first.
+    """
+    data = request.get_json() or {}
+    template_id = data.get('template_id')
+    start_date_str = data.get('start_date')
+
+    if not template_id:
+        return jsonify({'message': 'template_id is required'}), 400
+
+    start_date = date.today()
+    if start_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'message': 'Invalid date format. Please use YYYY-MM-DD.'}), 400
+
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({'message': 'Group not found'}), 404
+    template = WorkoutTemplate.query.get(template_id)
+    if not template:
+        return jsonify({'message': 'Template not found'}), 404
+    template_version_id = ensure_current_version(template).id
+
+    members = db.session.query(Client.id, Client.deleted) \
+        .join(group_membership, group_membership.c.client_id == Client.id) \
+        .filter(group_membership.c.group_id == group.id).all()
+    member_ids = [row.id for row in members]
+    assign_ids = [row.id for row in members if not row.deleted]
+
+    rows = [{
+        'id': f"pa_{uuid.uuid4()}",
+        'client_id': cid,
+        'template_id': template_id,
+        'template_version_id': template_version_id,
+        'start_date': start_date,
+        'active': True,
+        'current_day_index': 0,
+    } for cid in assign_ids]
+    try:
+        if rows:
+            stale_ids = db.session.query(ProgramAssignment.id).filter(
+                ProgramAssignment.client_id.in_(assign_ids), ProgramAssignment.active == False)
+            ClientExerciseCustomization.query.filter(
+                ClientExerciseCustomization.assignment_id.in_(stale_ids.scalar_subquery())
+            ).delete(synchronize_session=False)
+            ProgramAssignment.query.filter(
+                ProgramAssignment.client_id.in_(assign_ids), ProgramAssignment.active == False
+            ).delete(synchronize_session=False)
+            ProgramAssignment.query.filter(
+                ProgramAssignment.client_id.in_(assign_ids), ProgramAssignment.active == True
+            ).update({ProgramAssignment.active: False}, synchronize_session=False)
+            db.session.execute(db.insert(ProgramAssignment), rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error assigning program to group {group_id}: {e}")
+        return jsonify({'message': 'Failed to assign program to group'}), 500
+
+    assignment_by_client = {row['client_id']: row['id'] for row in rows}
+    results = []
+    for cid in member_ids:
+        if cid in assignment_by_client:
+            results.append({'client_id': cid, 'status': 'assigned', 'assignment_id': assignment_by_client[cid]})
+        else:
+            results.append({'client_id': cid, 'status': 'client_deleted'})
+
+    return jsonify({
+        'group_id': group.id,
+        'template_id': template_id,
+        'start_date': start_date.isoformat(),
+        'assigned': len(rows),
+        'results': results,
+    }), 201
+
 @app.route("/api/workout-templates", methods=["GET"])
 @protected
 def alias_get_workout_templates():
@@ -1617,6 +2393,25 @@ def create_program():
     db.session.commit()
     return jsonify(program_to_dict(new_program)), 201
 
+@app.route('/api/programs/<program_id>/schedule', methods=['GET'])
+@protected
+def get_program_schedule(program_id):
+    """Lays a program out from ?start_date= and lists its sessions between ?from= and ?to=."""
+    program = Program.query.get(program_id)
+    if not program:
+        return jsonify({'message': 'Program not found'}), 404
+    start_date = _to_date(request.args.get('start_date')) or date.today()
+    calendar = get_program_calendar(program, start_date)
+    range_start, range_end, error = _date_range(request.args, start_date)
+    if error:
+        return jsonify({'message': error}), 400
+    return jsonify({
+        'programId': program.id,
+        'startDate': start_date.isoformat(),
+        'lengthDays': len(calendar),
+        'sessions': [{'date': d.isoformat(), **session} for d, session in calendar.sessions_in_range(range_start, range_end)],
+    })
+
 @app.route('/api/programs/<program_id>', methods=['DELETE'])
 @protected
 def delete_program(program_id):
@@ -1627,6 +2422,67 @@ def delete_program(program_id):
     db.session.commit()
     return '', 204
 
+@app.route("/api/clients/<client_id>/program/suggestions", methods=["GET"])
+def get_progression_suggestions(client_id):
+    """
+    Suggested load and reps for each exercise of the client's next day
+    (?day_index= overrides). ?rule=, ?increment=, ?target_rpe= and ?percent=
+    override the progression defaults.
+    """
+    client = find_client(client_id)
+    if not client:
+        return jsonify({"message": "Client not found!"}), 404
+    assignment = ProgramAssignment.query.filter_by(client_id=client.id, active=True).first()
+    template = WorkoutTemplate.query.get(assignment.template_id) if assignment else None
+    if not assignment or not template:
+        return jsonify({"message": "No active program assigned"}), 404
+
+    settings = {}
+    rule = request.args.get('rule')
+    if rule:
+        if rule not in PROGRESSION_RULES:
+            return jsonify({"message": f"Unknown rule. Use one of: {', '.join(PROGRESSION_RULES)}"}), 400
+        settings['rule'] = rule
+    for key in ('increment', 'target_rpe', 'percent'):
+        value = _to_float(request.args.get(key))
+        if value is not None:
+            if value <= 0:
+                return jsonify({"message": f"{key} must be positive"}), 400
+            if key == 'percent':
+                # Accepted as a share (0.75) or, like template exercises, a percentage (75)
+                value = value / 100 if value > 1 else value
+                if value > 1:
+                    return jsonify({"message": "percent must be at most 100"}), 400
+            settings[key] = value
+
+    days = get_assignment_days(assignment, template)
+    day_index = _to_int(request.args.get('day_index'))
+    if day_index is None:
+        day_index = assignment.current_day_index or 0
+    if not 0 <= day_index < len(days):
+        return jsonify({"message": "Day index out of range"}), 400
+
+    customizations = {c.exercise_id: c for c in ClientExerciseCustomization.query.filter_by(
+        assignment_id=assignment.id, day_index=day_index).all()}
+    exercises = []
+    for exercise in iter_day_exercises(days[day_index]):
+        custom = customizations.get(exercise.get('id'))
+        if custom:
+            if custom.enabled is False:
+                continue
+            custom_sets = json.loads(custom.custom_sets or '[]')
+            if custom.substitute_exercise_id or custom_sets:
+                exercise = {**exercise, 'id': custom.substitute_exercise_id or exercise.get('id')}
+                if custom_sets:
+                    exercise['sets'] = custom_sets
+        exercises.append(exercise)
+
+    return jsonify({
+        "assignmentId": assignment.id,
+        "dayIndex": day_index,
+        "suggestions": suggest_progressions(client.id, exercises, settings),
+    })
+
 # --- Workout Statistics Endpoint ---
 @app.route("/api/clients/<client_id>/program/<assignment_id>/stats", methods=["GET"])
 @protected
@@ -1647,12 +2503,7 @@ def get_program_stats(client_id, assignment_id):
     if not template:
         return jsonify({"message": "Template not found"}), 404
 
-    try:
-        days = json.loads(template.days) if template.days else []
-    except json.JSONDecodeError:
-        days = []
-
-    total_days = len(days)
+    total_days = len(get_assignment_days(assignment, template))
     # Initialize counts list
     day_counts = [0] * total_days
 
@@ -1689,11 +2540,13 @@ def log_workout(client_id):
     app.logger.info(f"Logging workout for client: {client_id} (resolved to {client.id}), assignment_id: {assignment_id}")
     app.logger.info(f"Workout data keys: {list(data.keys())}")
     
+    day_index_completed = _to_int(data.get('day_index_completed')) or 0
+
     # Create workout log entry
     workout_log = WorkoutLog(
         client_id=client.id,
         assignment_id=assignment_id,
-        day_index_completed=data.get('day_index_completed', 0),
+        day_index_completed=day_index_completed,
         actual_date=date.today(),
         performance_data=json.dumps({
             'performanceLog': data.get('performanceLog', {}),
@@ -1704,15 +2557,141 @@ def log_workout(client_id):
     
     try:
         db.session.add(workout_log)
+        # Advance the day pointer in the same transaction as the log
+        next_index = None
+        assignment = ProgramAssignment.query.filter_by(id=assignment_id, client_id=client.id) \
+            .with_for_update().first()
+        if assignment:
+            template = WorkoutTemplate.query.get(assignment.template_id)
+            next_index = advance_day_pointer(assignment, template, day_index_completed)
         db.session.commit()
         app.logger.info(f"Successfully logged workout with ID: {workout_log.id}")
-        return jsonify({"message": "Workout logged successfully", "log_id": workout_log.id}), 201
+        return jsonify({"message": "Workout logged successfully", "log_id": workout_log.id,
+                        "next_day_index": next_index}), 201
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error logging workout: {e}")
         return jsonify({"message": "Failed to log workout"}), 500
 
+@app.route("/api/program-assignments/repair-day-pointers", methods=["POST"])
+@protected
+def repair_assignment_day_pointers():
+    """Recomputes every assignment's current_day_index from its workout logs."""
+    try:
+        return jsonify(repair_day_pointers()), 200
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error repairing assignment day pointers: {e}")
+        return jsonify({"message": "Failed to repair day pointers."}), 500
+
+# --- Resource Endpoints ---
+@app.route("/api/resources", methods=["GET"])
+@protected
+def get_resources():
+    resources = Resource.query.order_by(Resource.uploaded_at.desc()).all()
+    return jsonify([resource_to_dict(r) for r in resources])
+
+@app.route("/api/resources/uploads", methods=["POST"])
+@protected
+def create_resource_upload():
+    """
+    Starts a resumable upload. Body: {"title", "filename", "size"?, "sha256"?, "content_type"?}.
+    Send chunks with PUT /api/resources/uploads/<id>?offset=N, then POST .../complete.
+    """
+    from werkzeug.utils import secure_filename
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title') or '').strip()
+    filename = secure_filename(data.get('filename') or '')
+    if not title or not filename:
+        return jsonify({"message": "title and filename are required"}), 400
+    size = _to_int(data.get('size'))
+    if data.get('size') not in (None, '') and size is None:
+        return jsonify({"message": "size must be an integer"}), 400
+    try:
+        upload = create_upload(title[:100], filename, total_size=size, sha256=data.get('sha256'),
+                               content_type=data.get('content_type'))
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    return jsonify({**upload.to_dict(), "max_chunk_size": MAX_CHUNK_SIZE}), 201
+
+@app.route("/api/resources/uploads/<upload_id>", methods=["GET"])
+@protected
+def get_resource_upload(upload_id):
+    """Upload state; `offset` is where the next chunk must start."""
+    upload = ResourceUpload.query.get(upload_id)
+    if not upload:
+        return jsonify({"message": "Upload not found"}), 404
+    return jsonify(upload.to_dict())
+
+@app.route("/api/resources/uploads/<upload_id>", methods=["PUT"])
+@protected
+def append_resource_upload_chunk(upload_id):
+    """Appends the raw request body at ?offset=; a 409 carries the offset to resume from."""
+    offset = _to_int(request.args.get('offset'))
+    if offset is None or offset < 0:
+        return jsonify({"message": "offset is required"}), 400
+    try:
+        upload = append_chunk(upload_id, offset, request.stream, request.content_length)
+        db.session.commit()
+    except OffsetMismatch as e:
+        db.session.rollback()
+        return jsonify({"message": str(e), "offset": e.expected}), 409
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 404
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error storing upload chunk: {e}")
+        return jsonify({"message": "Failed to store chunk"}), 500
+    return jsonify(upload.to_dict())
+
+@app.route("/api/resources/uploads/<upload_id>/complete", methods=["POST"])
+@protected
+def complete_resource_upload(upload_id):
+    """Verifies the checksum (body {"sha256"} or the one given at creation) and creates the resource."""
+    data = request.get_json(silent=True) or {}
+    try:
+        resource, finished_parts = complete_upload(upload_id, data.get('sha256'))
+        db.session.commit()
+    except ChecksumMismatch as e:
+        # Keep the reset so the client starts over; its parts go only once that is committed
+        db.session.commit()
+        delete_parts(e.parts)
+        return jsonify({"message": str(e), "offset": 0}), 422
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 404
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error completing upload: {e}")
+        return jsonify({"message": "Failed to complete upload"}), 500
+    delete_parts(finished_parts)
+    return jsonify(resource_to_dict(resource)), 201
+
+@app.route("/api/resources/uploads/<upload_id>", methods=["DELETE"])
+@protected
+def abort_resource_upload(upload_id):
+    try:
+        parts = abort_upload(upload_id)
+        db.session.commit()
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 404
+    delete_parts(parts)
+    return jsonify({"message": "Upload cancelled"})
+
 # --- Workout Session Management ---
+def _workout_session_key(client_id):
+    return f"sessions/client_{client_id}_session.json"
+
 @app.route("/api/clients/<client_id>/workout-session/save", methods=["POST"])
 def save_workout_progress(client_id):
     """Saves in-progress workout data for later resumption."""
@@ -1725,21 +2704,15 @@ def save_workout_progress(client_id):
         return jsonify({"message": "No data provided"}), 400
 
     try:
-        # Store session data in client's session field or create a separate session table
-        # For now, using a simple approach with a session file per client
-        import os
-        session_dir = os.path.join('backend', 'sessions')
-        os.makedirs(session_dir, exist_ok=True)
-        
-        session_file = os.path.join(session_dir, f'client_{client.id}_session.json')
+        # One session document per client, kept in blob storage
         session_data = {
             'timestamp': datetime.now().isoformat(),
             'workout_data': data,
             'client_id': client.id
         }
         
-        with open(session_file, 'w') as f:
-            json.dump(session_data, f)
+        get_blob_storage().put_bytes(json.dumps(session_data).encode('utf-8'),
+                                     key=_workout_session_key(client.id), content_type='application/json')
             
         return jsonify({"message": "Workout progress saved"}), 200
     except Exception as e:
@@ -1754,21 +2727,19 @@ def get_workout_session(client_id):
         return jsonify({"message": "Client not found!"}), 404
 
     try:
-        import os
-        session_file = os.path.join('backend', 'sessions', f'client_{client.id}_session.json')
-        
-        if not os.path.exists(session_file):
+        storage = get_blob_storage()
+        session_key = _workout_session_key(client.id)
+        try:
+            with storage.open(session_key) as f:
+                session_data = json.load(f)
+        except BlobNotFound:
             return jsonify({"session": None}), 200
-        
-        with open(session_file, 'r') as f:
-            session_data = json.load(f)
             
         # Check if session is recent (within 24 hours)
-        from datetime import datetime, timedelta
         session_time = datetime.fromisoformat(session_data['timestamp'])
         if datetime.now() - session_time > timedelta(hours=24):
             # Session too old, delete it
-            os.remove(session_file)
+            storage.delete(session_key)
             return jsonify({"session": None}), 200
             
         return jsonify({"session": session_data}), 200
@@ -1784,11 +2755,7 @@ def clear_workout_session(client_id):
         return jsonify({"message": "Client not found!"}), 404
 
     try:
-        import os
-        session_file = os.path.join('backend', 'sessions', f'client_{client.id}_session.json')
-        
-        if os.path.exists(session_file):
-            os.remove(session_file)
+        get_blob_storage().delete(_workout_session_key(client.id))
             
         return jsonify({"message": "Session cleared"}), 200
     except Exception as e:
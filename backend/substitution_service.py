@@ -0,0 +1,114 @@
+import json
+import threading
+
+import numpy as np
+
+from .models import db, Exercise
+
+# Relative weight of each feature group in the similarity score
+FEATURE_WEIGHTS = {
+    'target': 3.0,
+    'bodyPart': 1.5,
+    'secondaryMuscles': 1.0,
+    'equipment': 1.0,
+}
+
+
+def _parse_secondary_muscles(raw):
+    if not raw:
+        return []
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError:
+        return [m.strip() for m in raw.split(',') if m.strip()]
+    if isinstance(parsed, list):
+        return [str(m) for m in parsed]
+    if isinstance(parsed, str):
+        return [parsed]
+    return []
+
+
+def _normalize(value):
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+class ExerciseSimilarityIndex:
+    """
+    Weighted one-hot feature matrix over the exercise catalog.
+
+    Rows are L2-normalised, so the cosine similarity of one exercise against the
+    whole catalog is a single matrix-vector product.
+    """
+
+    def __init__(self, rows):
+        self.ids = [row.id for row in rows]
+        self.row_by_id = {exercise_id: i for i, exercise_id in enumerate(self.ids)}
+
+        features_per_row = []
+        vocabulary = {}
+        for row in rows:
+            features = []
+            for group, values in (
+                ('target', [row.target]),
+                ('bodyPart', [row.bodyPart]),
+                ('equipment', [row.equipment]),
+                ('secondaryMuscles', _parse_secondary_muscles(row.secondaryMuscles)),
+            ):
+                for value in values:
+                    value = _normalize(value)
+                    if value:
+                        key = (group, value)
+                        vocabulary.setdefault(key, len(vocabulary))
+                        features.append(key)
+            features_per_row.append(features)
+
+        matrix = np.zeros((len(rows), max(len(vocabulary), 1)), dtype=np.float32)
+        for i, features in enumerate(features_per_row):
+            for key in features:
+                matrix[i, vocabulary[key]] = FEATURE_WEIGHTS[key[0]]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+        self.equipment = np.array([_normalize(row.equipment) or '' for row in rows], dtype=object)
+
+    def top_k(self, exercise_id, k=10, equipment=None):
+        """
+        Returns up to `k` (exercise_id, score) pairs most similar to `exercise_id`,
+        optionally restricted to exercises using one of `equipment`.
+        """
+        row = self.row_by_id.get(exercise_id)
+        if row is None:
+            return None
+
+        scores = self.matrix @ self.matrix[row]
+        scores[row] = -np.inf
+        if equipment:
+            allowed = {_normalize(e) for e in equipment if _normalize(e)}
+            scores[~np.isin(self.equipment, list(allowed))] = -np.inf
+
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if candidates.size == 0:
+            return []
+        k = min(k, candidates.size)
+        best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.ids[i], round(float(scores[i]), 4)) for i in best]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(catalog_version):
+    """Returns the similarity index, rebuilding it once per exercise catalog version."""
+    global _index, _index_version
+    with _index_lock:
+        if _index is None or _index_version != catalog_version:
+            rows = db.session.query(
+                Exercise.id, Exercise.target, Exercise.bodyPart,
+                Exercise.equipment, Exercise.secondaryMuscles,
+            ).order_by(Exercise.id).all()
+            _index = ExerciseSimilarityIndex(rows)
+            _index_version = catalog_version
+        return _index
@@ -0,0 +1,112 @@
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_TEMPLATES = 256
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict used for cached template structures. It is still a dict, so
+    jsonify serialises it directly; callers that need to customise a day make a
+    shallow `dict(day)` copy instead of mutating the shared one.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached template structures are read-only; copy before modifying.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+
+def freeze(value):
+    """Recursively converts parsed JSON into FrozenDicts and tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def parse_days(raw_days):
+    """Parses a WorkoutTemplate.days value into a list, tolerating bad JSON."""
+    if not raw_days:
+        return []
+    if isinstance(raw_days, (list, tuple)):
+        return list(raw_days)
+    try:
+        parsed = json.loads(raw_days)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def iter_day_exercises(day):
+    """Yields the exercises of a template day, whether stored flat or inside groups."""
+    if not isinstance(day, dict):
+        return
+    for exercise in day.get('exercises') or ():
+        if isinstance(exercise, dict):
+            yield exercise
+    for group in day.get('groups') or ():
+        if isinstance(group, dict):
+            for exercise in group.get('exercises') or ():
+                if isinstance(exercise, dict):
+                    yield exercise
+
+
+def summarize_days(days):
+    """Returns (day_count, exercise_count) for parsed template days."""
+    return len(days), sum(1 for day in days for _ in iter_day_exercises(day))
+
+
+class TemplateCache:
+    """Bounded LRU of parsed template days keyed by (template id, updated_at)."""
+
+    def __init__(self, max_templates=DEFAULT_MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_days(self, template):
+        key = (template.id, template.updated_at)
+        with self._lock:
+            days = self._entries.get(key)
+            if days is not None:
+                self._entries.move_to_end(key)
+                return days
+
+        days = freeze(parse_days(template.days))
+
+        with self._lock:
+            # Drop superseded versions of this template before storing the new one
+            for stale in [k for k in self._entries if k[0] == template.id and k != key]:
+                del self._entries[stale]
+            self._entries[key] = days
+            while len(self._entries) > self.max_templates:
+                self._entries.popitem(last=False)
+        return days
+
+    def invalidate(self, template_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == template_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+template_cache = TemplateCache()
+
+
+def get_template_days(template):
+    """Returns the parsed, read-only days of a WorkoutTemplate, shared across requests."""
+    return template_cache.get_days(template)
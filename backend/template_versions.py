@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.exc import IntegrityError
+
+from .models import db, TemplateDay, WorkoutTemplateVersion
+from .template_cache import freeze, get_template_days, parse_days
+
+MAX_CACHED_DAYS = 2048
+SNAPSHOT_ATTEMPTS = 3
+
+
+def canonical_day_json(day):
+    return json.dumps(day, sort_keys=True, separators=(',', ':'))
+
+
+def day_hash(day):
+    """Content hash identifying a day structure across templates and versions."""
+    return hashlib.sha256(canonical_day_json(day).encode('utf-8')).hexdigest()
+
+
+class DayCache:
+    """LRU of parsed, read-only day structures keyed by content hash."""
+
+    def __init__(self, max_days=MAX_CACHED_DAYS):
+        self.max_days = max_days
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes):
+        found = {}
+        with self._lock:
+            for h in hashes:
+                day = self._entries.get(h)
+                if day is not None:
+                    self._entries.move_to_end(h)
+                    found[h] = day
+        return found
+
+    def put(self, h, day):
+        with self._lock:
+            self._entries[h] = day
+            self._entries.move_to_end(h)
+            while len(self._entries) > self.max_days:
+                self._entries.popitem(last=False)
+
+
+day_cache = DayCache()
+
+
+def latest_version(template_id):
+    return WorkoutTemplateVersion.query.filter_by(template_id=template_id) \
+        .order_by(WorkoutTemplateVersion.version.desc()).first()
+
+
+def _store_days(hashes, days):
+    """Inserts the day structures not stored yet; a day saved concurrently by another template is kept."""
+    known = {row.hash for row in db.session.query(TemplateDay.hash).filter(TemplateDay.hash.in_(set(hashes)))} if hashes else set()
+    for h, day in zip(hashes, days):
+        if h not in known:
+            try:
+                # Savepoint per day: the same content inserted by another writer just means it's stored
+                with db.session.begin_nested():
+                    db.session.add(TemplateDay(hash=h, content=canonical_day_json(day)))
+            except IntegrityError:
+                pass
+            known.add(h)
+        day_cache.put(h, day)
+
+
+def snapshot_template(template):
+    """
+    Records the template's current days as a new immutable version, storing only
+    day structures that aren't already known by hash. Returns the existing latest
+    version when nothing changed. Caller commits.
+    """
+    # Parse directly: the template may have unflushed edits the shared cache hasn't seen
+    days = freeze(parse_days(template.days))
+    hashes = [day_hash(day) for day in days]
+
+    for attempt in range(SNAPSHOT_ATTEMPTS):
+        current = latest_version(template.id)
+        if current and json.loads(current.day_hashes) == hashes and current.name == template.name:
+            return current
+        if attempt == 0:
+            _store_days(hashes, days)
+        version = WorkoutTemplateVersion(
+            template_id=template.id,
+            version=(current.version + 1) if current else 1,
+            name=template.name,
+            day_hashes=json.dumps(hashes),
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(version)
+            return version
+        except IntegrityError:
+            # A concurrent save claimed this number; re-read the latest version and go again
+            if attempt == SNAPSHOT_ATTEMPTS - 1:
+                raise
+
+
+def ensure_current_version(template):
+    """Returns the template's latest version, snapshotting it first if it has none."""
+    return latest_version(template.id) or snapshot_template(template)
+
+
+def get_version_days(version):
+    """Returns a version's days as read-only structures, reusing days cached by hash."""
+    hashes = json.loads(version.day_hashes or '[]')
+    found = day_cache.get_many(hashes)
+    missing = [h for h in set(hashes) if h not in found]
+    if missing:
+        for row in TemplateDay.query.filter(TemplateDay.hash.in_(missing)).all():
+            day = freeze(json.loads(row.content))
+            day_cache.put(row.hash, day)
+            found[row.hash] = day
+    return tuple(found[h] for h in hashes if h in found)
+
+
+def get_versions_days(versions):
+    """
+    {version id: days} for many versions, loading every day missing from the
+    cache in one query. Days read here are not added to the shared cache, so
+    a sweep over all versions doesn't evict the ones requests keep using.
+    """
+    hashes_by_version = {v.id: json.loads(v.day_hashes or '[]') for v in versions}
+    wanted = {h for hashes in hashes_by_version.values() for h in hashes}
+    found = day_cache.get_many(wanted)
+    missing = wanted - found.keys()
+    if missing:
+        for row in TemplateDay.query.filter(TemplateDay.hash.in_(missing)).all():
+            found[row.hash] = freeze(json.loads(row.content))
+    return {vid: tuple(found[h] for h in hashes if h in found) for vid, hashes in hashes_by_version.items()}
+
+
+def get_assignment_days(assignment, template):
+    """Days an assignment should show: its pinned version, or the live template for unpinned rows."""
+    if assignment.template_version_id and assignment.template_version:
+        return get_version_days(assignment.template_version)
+    return get_template_days(template)